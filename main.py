@@ -12,216 +12,4038 @@ Version: 1.1.0
 """
 
 import argparse
+import asyncio
+import bisect
+import contextlib
+import csv
+import ctypes
+import ctypes.util
+import datetime
+import functools
+import glob
+import hashlib
+import html
+import io
+import itertools
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import select
+import shutil
+import signal
+import socket
+import struct
 import sys
+import tarfile
+import textwrap
+import time
 import toml
+import urllib.parse
+import zipfile
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from decimal import Decimal, ROUND_HALF_UP
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from xml.sax.saxutils import escape as xml_escape
 
 # Third-party library for PDF creation.
 # Install with: pip install reportlab
 try:
+    from reportlab import rl_config
     from reportlab.pdfgen import canvas
     from reportlab.lib.pagesizes import letter
     from reportlab.lib import colors
     from reportlab.platypus import Table, TableStyle, Paragraph # MODIFIED: Added Paragraph
-    from reportlab.lib.styles import getSampleStyleSheet # ADDED: For paragraph styling
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet # ADDED: For paragraph styling
     from reportlab.lib.units import inch
+    from reportlab.pdfbase import pdfdoc, pdfmetrics
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfbase.ttfonts import TTFont, TTFError
+    from reportlab.lib.rl_accel import fp_str
 except ImportError:
     print("Error: The 'reportlab' library is required. Please install it using 'pip install reportlab'.")
     sys.exit(1)
 
+# Optional: vectorizes totals over whole batches (see batch_totals).
+# Install with: pip install numpy (the 'fast' extra)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# --- Constants for PDF Layout ---
+PAGE_WIDTH, PAGE_HEIGHT = letter
+TOP_MARGIN = PAGE_HEIGHT - inch
+BOTTOM_MARGIN = inch
+LEFT_MARGIN = inch
+RIGHT_MARGIN = PAGE_WIDTH - inch
+CONTENT_WIDTH = PAGE_WIDTH - (2 * inch)
+
+# Items table pagination. The table starts below the header block on the
+# first page and near the top on continuation pages. On the last page it must
+# end high enough to leave room for the totals (1 inch below the table)
+# above the fixed-position Terms block.
+INFO_TOP = TOP_MARGIN - 1.5 * inch
+BALANCE_DUE_Y = INFO_TOP - 0.5 * inch
+FIRST_PAGE_TABLE_TOP = TOP_MARGIN - 3 * inch
+CONTINUED_TABLE_TOP = TOP_MARGIN - 0.5 * inch
+TERMS_Y = BOTTOM_MARGIN + 1 * inch
+TERMS_TOP = TERMS_Y + 0.25 * inch
+LAST_PAGE_TABLE_FLOOR = TERMS_TOP + 1 * inch
+TABLE_COL_WIDTHS = [CONTENT_WIDTH * 0.55, CONTENT_WIDTH * 0.15, CONTENT_WIDTH * 0.15, CONTENT_WIDTH * 0.15]
+TABLE_FONT_SIZE = 10
+TABLE_LEADING = 1.2 * TABLE_FONT_SIZE  # reportlab's leading for plain string cells
+TABLE_PADDING = 10                     # LEFTPADDING / RIGHTPADDING
+TABLE_ROW_PADDING = 3 + 3              # default TOPPADDING + BOTTOMPADDING
+TABLE_HEADER_HEIGHT = TABLE_LEADING + 3 + 12
+
+
+# --- Fonts ---
+
+# Names a TOML file whose [fonts] table applies to invoices without their own.
+FONT_CONFIG_ENV = 'INVOICE_FONTS'
+
+
+class FontFamily(NamedTuple):
+    """The reportlab font names of an invoice's regular and bold text."""
+    regular: str
+    bold: str
+
+
+DEFAULT_FONTS = FontFamily('Helvetica', 'Helvetica-Bold')
+
+
+def font_paths(data: dict) -> tuple[str, str] | None:
+    """
+    The regular and bold TrueType files an invoice is set in, from its
+    [fonts] table or else the INVOICE_FONTS config file; None for Helvetica.
+
+    Raises:
+        InvoiceDataError: If the [fonts] table or the config file is invalid.
+    """
+    spec = data.get('fonts')
+    if spec is None:
+        return _configured_font_paths()
+    return _font_paths(spec, Path.cwd())
+
+
+def anchor_fonts(data: dict, base: Path) -> dict:
+    """
+    Makes the relative paths of an invoice's [fonts] table relative to base,
+    the directory of the file it was read from, instead of the working
+    directory; returns data. Invalid tables are left for font_paths to report.
+    """
+    spec = data.get('fonts')
+    if isinstance(spec, dict):
+        data['fonts'] = {key: str(base / Path(value).expanduser())
+                         if key in ('regular', 'bold') and isinstance(value, str) else value
+                         for key, value in spec.items()}
+    return data
+
+
+def _font_paths(spec, base: Path) -> tuple[str, str]:
+    if (not isinstance(spec, dict) or not isinstance(spec.get('regular'), str)
+            or not isinstance(spec.get('bold', ''), str)):
+        raise InvoiceDataError("[fonts] must give the path of a 'regular' TrueType file "
+                               "and optionally a 'bold' one.")
+    regular = str((base / Path(spec['regular']).expanduser()).resolve())
+    bold = str((base / Path(spec['bold']).expanduser()).resolve()) if 'bold' in spec else regular
+    return regular, bold
+
+
+@functools.lru_cache(maxsize=None)
+def _configured_font_paths() -> tuple[str, str] | None:
+    config_path = os.environ.get(FONT_CONFIG_ENV)
+    if not config_path:
+        return None
+    path = Path(config_path).expanduser()
+    try:
+        config = toml.loads(path.read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError, toml.TomlDecodeError) as e:
+        raise InvoiceDataError(f"Cannot read the font config {path}: {e}") from e
+    return _font_paths(config.get('fonts'), path.parent)
+
+
+@functools.lru_cache(maxsize=None)
+def register_font(path: str) -> str:
+    """
+    Parses a TrueType file and registers it with reportlab, once per process;
+    returns its font name.
+
+    Registration only loads the metrics and glyph tables: each document
+    embeds a subset holding just the glyphs it uses, so large batches stay
+    small however big the font is.
+    """
+    try:
+        pdfmetrics.registerFont(TTFont(path, path))
+    except TTFError as e:
+        raise InvoiceDataError(f"Cannot load the font {path}: {e}") from e
+    return path
+
+
+def invoice_fonts(data: dict) -> FontFamily:
+    """The registered fonts an invoice is drawn with (see font_paths)."""
+    paths = font_paths(data)
+    if paths is None:
+        return DEFAULT_FONTS
+    return FontFamily(*map(register_font, paths))
+
+
+# Text Paragraph would draw unchanged: single spaces between words, no markup.
+PLAIN_TEXT = re.compile(r'[^\s<>&]+(?: [^\s<>&]+)*')
+
+TEXT_CACHE_SIZE = 4096
+
+
+class TextMetrics:
+    """
+    A bounded LRU cache of measured string widths and wrapped lines.
+
+    Invoices repeat the same descriptions across thousands of documents, so
+    each distinct (text, font, size) is measured, and each distinct
+    (text, font, size, width) broken into lines, once per process. Beyond
+    max_entries the least recently used results are dropped; stats counts
+    hits, misses and evictions for sizing it.
+    """
+
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries = OrderedDict()
+
+    def width(self, text: str, font_name: str, font_size: float) -> float:
+        """The width of text drawn in the given font, in points."""
+        return self._lookup(('width', text, font_name, font_size),
+                            lambda: stringWidth(text, font_name, font_size))
+
+    def wrap(self, text: str, font_name: str, font_size: float, width: float) -> tuple[str, ...]:
+        """
+        The lines a Paragraph of text in the given font breaks into within
+        width. Text is taken literally; runs of whitespace collapse.
+        """
+        return self._lookup(('wrap', text, font_name, font_size, width),
+                            lambda: _wrap_lines(text, font_name, font_size, width))
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def _lookup(self, key: tuple, compute):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.stats['misses'] += 1
+            value = self._entries[key] = compute()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            return value
+        self.stats['hits'] += 1
+        self._entries.move_to_end(key)
+        return value
+
+
+def _wrap_lines(text: str, font_name: str, font_size: float, width: float) -> tuple[str, ...]:
+    # Let Paragraph find the breaks, so the lines match what it would draw.
+    style = ParagraphStyle('TextMetrics', fontName=font_name, fontSize=font_size)
+    paragraph = Paragraph(xml_escape(text), style)
+    paragraph.wrap(width, PAGE_HEIGHT)
+    if paragraph.blPara.kind == 0:
+        return tuple(' '.join(words) for _, words in paragraph.blPara.lines)
+    # Entities split the text into fragments; each line then holds them in order.
+    return tuple(''.join(frag.text for frag in line.words) for line in paragraph.blPara.lines)
+
+
+class RenderContext:
+    """
+    The fonts, styles and table layout shared by every render in a process
+    that uses the same font family.
+
+    Building a stylesheet and a TableStyle is a fixed cost per invoice that
+    adds up in batch, daemon and server runs, so both are built once here
+    (see render_context) and only read afterwards. Apart from the text
+    measurement cache, nothing in a context is mutated while drawing.
+    """
+
+    def __init__(self, fonts: FontFamily = DEFAULT_FONTS):
+        self.col_widths = list(TABLE_COL_WIDTHS)
+        self.description_width = self.col_widths[0] - 2 * TABLE_PADDING
+        self.font_name, self.bold_font_name = fonts
+        self.font_size = TABLE_FONT_SIZE
+        self.metrics = text_metrics()
+        # Distinguishes the shared page templates of each font family.
+        self.form_suffix = '' if fonts == DEFAULT_FONTS else hashlib.sha1(repr(fonts).encode()).hexdigest()[:8]
+        # A private copy: getSampleStyleSheet()'s 'Normal' is not ours to change.
+        self.description_style = ParagraphStyle(
+            'InvoiceItem', parent=getSampleStyleSheet()['Normal'],
+            fontName=self.font_name, fontSize=self.font_size,
+        )
+        self.table_header = ['Item', 'Quantity', 'Rate', 'Amount']
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkslategray),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'), # Align numeric columns to the right
+            ('FONTNAME', (0, 0), (-1, 0), self.bold_font_name),
+            ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTSIZE', (0, 0), (-1, -1), self.font_size),
+            ('LEFTPADDING', (0, 0), (-1, -1), TABLE_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), TABLE_PADDING),
+        ])
+
+    def description_lines(self, text) -> tuple[str, ...] | None:
+        """
+        The lines a description Paragraph would draw, or None when text holds
+        markup, entities or runs of whitespace that only a Paragraph handles.
+
+        Drawn as a multi-line string cell, these lines look exactly like the
+        Paragraph, without laying it out again for every row. Paragraph
+        lets a line run slightly past the column and then shrinks its word
+        spacing, which a string cell cannot do; such text is also left to it.
+        """
+        if not isinstance(text, str) or PLAIN_TEXT.fullmatch(text) is None:
+            return None
+        if self.metrics.width(text, self.font_name, self.font_size) <= self.description_width:
+            return (text,)
+        lines = self.metrics.wrap(text, self.font_name, self.font_size, self.description_width)
+        if any(self.metrics.width(line, self.font_name, self.font_size) > self.description_width
+               for line in lines):
+            return None
+        return lines
+
+
+@functools.lru_cache(maxsize=None)
+def text_metrics() -> TextMetrics:
+    """The process-wide text measurement cache, shared by every font family."""
+    return TextMetrics()
+
+
+@functools.lru_cache(maxsize=None)
+def render_context(fonts: FontFamily = DEFAULT_FONTS) -> RenderContext:
+    """The process-wide RenderContext for a font family, built on first use."""
+    return RenderContext(fonts)
+
+
+# --- Compression Profiles ---
+
+class CompressionProfile(NamedTuple):
+    """How page content streams are encoded."""
+    compress: bool      # Flate-compress page and form streams
+    ascii85: bool       # wrap them in ASCII85 (reportlab's default): 7-bit clean, but ~25% larger
+    zlib_level: int     # for the native writer; reportlab always uses zlib's default
+
+
+COMPRESSION_PROFILES = {
+    'fast': CompressionProfile(compress=False, ascii85=False, zlib_level=0),
+    'balanced': CompressionProfile(compress=True, ascii85=True, zlib_level=6),
+    'small': CompressionProfile(compress=True, ascii85=False, zlib_level=9),
+}
+
+
+@contextlib.contextmanager
+def _stream_encoding(profile: CompressionProfile):
+    """Applies the profile's ASCII85 setting to reportlab while a document is built."""
+    saved = rl_config.useA85
+    rl_config.useA85 = int(profile.ascii85)
+    try:
+        yield
+    finally:
+        rl_config.useA85 = saved
+
+
+# --- Errors ---
+
+class InvoiceError(Exception):
+    """Base class for every error raised while loading or rendering an invoice."""
+
+
+class InvoiceParseError(InvoiceError):
+    """The invoice source (TOML or JSON) could not be parsed."""
+
+
+class InvoiceDataError(InvoiceError, ValueError):
+    """The invoice data is incomplete or holds values that cannot be used."""
+
+
+class InvoiceRenderError(InvoiceError):
+    """Drawing or serializing the PDF failed."""
+
+
+def parse_invoice(source: str | bytes, fmt: str = 'toml') -> dict:
+    """
+    Parses invoice data from a TOML or JSON document.
+
+    Args:
+        source (str | bytes): The document text.
+        fmt (str): Either 'toml' or 'json'.
+
+    Raises:
+        InvoiceParseError: If the document is malformed or not a table/object.
+    """
+    if isinstance(source, bytes):
+        try:
+            source = source.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise InvoiceParseError(f"Invoice data is not valid UTF-8: {e}") from e
+    try:
+        if fmt == 'toml':
+            data = toml.loads(source)
+        elif fmt == 'json':
+            data = json.loads(source)
+        else:
+            raise InvoiceParseError(f"Unsupported invoice format: {fmt!r}")
+    except (toml.TomlDecodeError, json.JSONDecodeError) as e:
+        raise InvoiceParseError(f"Could not parse the {fmt.upper()} data: {e}") from e
+    if not isinstance(data, dict):
+        raise InvoiceParseError(f"The {fmt.upper()} data must be a table/object at the top level.")
+    return data
+
+
+def load_invoice(path: Path) -> dict:
+    """
+    Reads and parses an invoice file; the format follows the file extension
+    (.json, anything else is read as TOML).
+
+    Raises:
+        OSError: If the file cannot be read.
+        InvoiceParseError: If the file cannot be parsed.
+    """
+    fmt = 'json' if path.suffix.lower() == '.json' else 'toml'
+    return anchor_fonts(parse_invoice(path.read_text(encoding='utf-8'), fmt), path.parent)
+
+
+# --- Multi-Invoice Files ---
+
+# Starts one entry of the array of tables in a multi-invoice TOML file.
+INVOICES_TABLE_HEADER = re.compile(rb'^\s*\[\[\s*invoices\s*\]\]\s*(#.*)?$')
+
+
+class InvoiceRecord(NamedTuple):
+    """
+    One invoice inside an input file, located without parsing it.
+
+    fmt is 'toml' or 'json' for a file holding a single invoice, 'jsonl' for
+    one line of a newline-delimited JSON file, and 'toml-array' for one
+    [[invoices]] entry. The top-level tables of a multi-invoice TOML file
+    (everything before the first [[invoices]]) are shared defaults for every
+    entry; they are kept in defaults.
+    """
+    index: int
+    fmt: str
+    start: int
+    end: int
+    source: bytes
+    defaults: bytes = b''
+
+
+def invoice_file_format(path: Path) -> str:
+    """The container format of an input file, from its extension."""
+    suffix = path.suffix.lower()
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'json' if suffix == '.json' else 'toml'
+
+
+def split_invoices(stream: BinaryIO, fmt: str) -> Iterator[InvoiceRecord]:
+    """
+    Splits a binary stream into per-invoice records, one at a time.
+
+    Only line boundaries are inspected, so memory use is bounded by the
+    largest single invoice no matter how many invoices the stream holds.
+
+    Args:
+        stream: A binary file or pipe.
+        fmt (str): 'toml', 'json' or 'jsonl' (see invoice_file_format).
+    """
+    if fmt == 'json':
+        source = stream.read()
+        yield InvoiceRecord(0, 'json', 0, len(source), source)
+        return
+
+    offset = 0
+    if fmt == 'jsonl':
+        index = 0
+        for line in stream:
+            if line.strip():
+                yield InvoiceRecord(index, 'jsonl', offset, offset + len(line), line)
+                index += 1
+            offset += len(line)
+        return
+
+    head = []
+    chunk = None
+    chunk_start = 0
+    defaults = b''
+    index = 0
+    for line in stream:
+        if INVOICES_TABLE_HEADER.match(line):
+            if chunk is None:
+                defaults = b''.join(head)
+                head = None
+            else:
+                yield InvoiceRecord(index, 'toml-array', chunk_start, offset, b''.join(chunk), defaults)
+                index += 1
+            chunk = [line]
+            chunk_start = offset
+        elif chunk is not None:
+            chunk.append(line)
+        else:
+            head.append(line)
+        offset += len(line)
+
+    if chunk is None:
+        yield InvoiceRecord(0, 'toml', 0, offset, b''.join(head))
+    else:
+        yield InvoiceRecord(index, 'toml-array', chunk_start, offset, b''.join(chunk), defaults)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_defaults(defaults: bytes) -> dict:
+    return parse_invoice(defaults, 'toml') if defaults.strip() else {}
+
+
+def parse_invoice_record(record: InvoiceRecord, base: Path | None = None) -> dict:
+    """
+    Parses one record produced by split_invoices into invoice data. Give base,
+    the directory of the file the record was read from, to resolve relative
+    font paths against it (see anchor_fonts).
+
+    Raises:
+        InvoiceParseError: If the record is not valid TOML or JSON.
+        InvoiceDataError: If a top-level table follows an [[invoices]]
+            entry. Shared tables must come before the first entry; a table
+            of the entry itself is written [invoices.sender].
+    """
+    if record.fmt in ('json', 'jsonl'):
+        data = parse_invoice(record.source, 'json')
+    elif record.fmt == 'toml':
+        data = parse_invoice(record.source, 'toml')
+    else:
+        parsed = parse_invoice(record.source, 'toml')
+        entries = parsed.pop('invoices', None)
+        if not isinstance(entries, list) or len(entries) != 1:
+            raise InvoiceParseError(f"Invoice #{record.index + 1} is not a single [[invoices]] table.")
+        if parsed:
+            tables = ', '.join(f"[{name}]" for name in parsed)
+            raise InvoiceDataError(f"Invoice #{record.index + 1} is followed by top-level {tables}; "
+                                   f"move shared tables before the first [[invoices]], or write "
+                                   f"[invoices.{next(iter(parsed))}] for this invoice's own.")
+        data = {**_parse_defaults(record.defaults), **entries[0]}
+    return data if base is None else anchor_fonts(data, base)
+
+
+def iter_invoices(path: Path) -> Iterator[dict]:
+    """Streams the invoices of a single- or multi-invoice file, one at a time."""
+    with path.open('rb') as stream:
+        for record in split_invoices(stream, invoice_file_format(path)):
+            yield parse_invoice_record(record, path.parent)
+
+
+def to_decimal(value, field: str) -> Decimal:
+    """Converts a TOML/JSON number to Decimal, naming the field on failure."""
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise InvoiceDataError(f"'{field}' must be a number, got {value!r}.") from None
+
+
+def default_output_name(data: dict, suffix: str = '.pdf') -> str:
+    """Builds the default PDF file name: Invoice-[ClientName]-[Date].pdf"""
+    client_name = data.get('client', {}).get('name', 'Client').replace(' ', '_').replace(',', '')
+    # A bare TOML date arrives as a date, not a string.
+    issue_date = str(data.get('invoice', {}).get('issue_date', 'date')).replace(' ', '_')
+    return f"Invoice-{client_name}-{issue_date}{suffix}"
+
+
+@contextlib.contextmanager
+def replacing_file(path: Path) -> Iterator[BinaryIO]:
+    """
+    Opens a temporary file next to path for writing and moves it over path
+    once the block completes; it is removed instead if the block raises.
+
+    An existing file is replaced, never written through: outputs may be hard
+    links to entries of the output cache (see RenderCache.fetch). Devices
+    and pipes such as /dev/stdout are written directly.
+    """
+    if path.exists() and not path.is_file():
+        with path.open('wb') as stream:
+            yield stream
+        return
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with temp_path.open('wb') as stream:
+            yield stream
+        os.replace(temp_path, path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def write_output(path: Path, content: bytes):
+    """Writes an output file through replacing_file."""
+    with replacing_file(path) as stream:
+        stream.write(content)
+
+
+def generate_invoice_pdf(data: dict, output_path: Path, items: Iterable[dict] | None = None,
+                         options: 'RenderOptions | None' = None):
+    """
+    Generates the invoice PDF from the parsed TOML data.
+
+    Args:
+        data (dict): A dictionary containing all the invoice data.
+        output_path (Path): The file path to save the generated PDF.
+        items (Iterable[dict]): Optional line items to stream in place of
+            the [[items]] section (see render_invoice_stream).
+        options (RenderOptions): Output format, backend and compression;
+            streamed items are always rendered to PDF with reportlab.
+    """
+    options = options or RenderOptions()
+    try:
+        if items is None:
+            write_output(output_path, render_output(data, *options))
+        else:
+            with replacing_file(output_path) as stream:
+                render_invoice_stream(data, items, options.compression, stream)
+        print(f"✅ Successfully generated invoice at: {output_path}")
+
+    except OSError as e:
+        print(f"Error: Could not write the PDF file: {e}", file=sys.stderr)
+        sys.exit(1)
+    except (InvoiceDataError, InvoiceParseError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except InvoiceError as e:
+        print(f"An unexpected error occurred during PDF generation: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def render_invoice(data: dict, backend: str = 'reportlab', compression: str = 'balanced') -> bytes:
+    """
+    Renders the invoice into an in-memory PDF.
+
+    This is the library entry point: it touches neither the filesystem nor
+    stdout, and reports problems by raising instead of exiting.
+
+    Args:
+        data (dict): A dictionary containing all the invoice data.
+        backend (str): 'reportlab', or 'native' to write the PDF directly
+            with PDFWriter, which is much faster for invoices it can draw
+            and falls back to reportlab for the rest.
+        compression (str): A key of COMPRESSION_PROFILES: 'fast' skips
+            compression, 'small' gives the smallest files.
+
+    Returns:
+        bytes: The complete PDF document.
+
+    Raises:
+        InvoiceDataError: If required sections are missing or values are invalid.
+        InvoiceRenderError: If reportlab fails to produce the document.
+    """
+    profile = COMPRESSION_PROFILES[compression]
+    buffer = io.BytesIO()
+    try:
+        if backend == 'native':
+            pdf = _render_native(data, profile)
+            if pdf is not None:
+                return pdf
+        with _stream_encoding(profile):
+            c = canvas.Canvas(buffer, pagesize=letter, pageCompression=int(profile.compress))
+            c.setTitle(invoice_title(data))
+            _draw_invoice(c, data)
+            c.save()
+    except InvoiceError:
+        raise
+    except (TypeError, AttributeError) as e:
+        raise InvoiceDataError(f"Invoice data contains an invalid value: {e}") from e
+    except Exception as e:
+        raise InvoiceRenderError(f"{type(e).__name__}: {e}") from e
+    return buffer.getvalue()
+
+
+def render_merged_invoices(invoices: Iterable[tuple[str, dict]], title: str = "Invoices",
+                           compression: str = 'balanced') -> tuple[bytes, list[tuple[str, str]]]:
+    """
+    Renders many invoices into one multi-page PDF.
+
+    All invoices are drawn onto a single canvas, so fonts and other shared
+    resources are written once for the whole document rather than once per
+    invoice, and the static parts of the page layout are stored once as form
+    XObjects. Each invoice starts on a new page and gets an outline entry.
+
+    Args:
+        invoices: (label, data) pairs; the label identifies skipped invoices.
+        title (str): The document title.
+        compression (str): A key of COMPRESSION_PROFILES.
+
+    Returns:
+        The PDF, and (label, message) for every invoice skipped because its
+        data was invalid.
+
+    Raises:
+        InvoiceDataError: If no invoice could be rendered at all.
+        InvoiceRenderError: If reportlab fails to produce the document.
+    """
+    profile = COMPRESSION_PROFILES[compression]
+    buffer = io.BytesIO()
+    skipped = []
+    rendered = 0
+    try:
+        with _stream_encoding(profile):
+            c = canvas.Canvas(buffer, pagesize=letter, pageCompression=int(profile.compress))
+            c.setTitle(title)
+            for label, data in invoices:
+                # Bookmark the invoice's first page; long invoices span several.
+                key = f"invoice-{rendered}"
+                c.bookmarkPage(key)
+                try:
+                    # Missing or wrongly typed sections are detected before
+                    # anything is drawn, so such an invoice leaves no trace.
+                    _draw_invoice(c, data, shared_templates=True)
+                except InvoiceDataError as e:
+                    skipped.append((label, str(e)))
+                    continue
+                except (TypeError, AttributeError) as e:
+                    skipped.append((label, f"Invoice data contains an invalid value: {e}"))
+                    continue
+                c.addOutlineEntry(invoice_title(data), key, level=0)
+                c.showPage()
+                rendered += 1
+            if not rendered:
+                raise InvoiceDataError("None of the invoices could be rendered.")
+            c.save()
+    except InvoiceError:
+        raise
+    except Exception as e:
+        raise InvoiceRenderError(f"{type(e).__name__}: {e}") from e
+    return buffer.getvalue(), skipped
+
+
+def invoice_title(data: dict) -> str:
+    """The PDF title / outline label of an invoice."""
+    invoice_info = data.get('invoice', {})
+    sender = data.get('sender', {})
+    return f"Invoice #{invoice_info.get('number', 'N/A')} from {sender.get('name', 'N/A')}"
+
+
+def _check_sections(data: dict, items: bool = True):
+    """
+    Checks that the required sections are present and of the right type, so
+    that invalid data is rejected before anything is drawn. Set items to
+    False when the line items come from elsewhere (render_invoice_stream).
+    """
+    sections = ('sender', 'client', 'invoice', 'items') if items else ('sender', 'client', 'invoice')
+    if not all(data.get(section) for section in sections):
+        raise InvoiceDataError("Invoice data is missing one of the required sections: "
+                               + ("[sender], [client], [invoice], or [[items]]." if items else
+                                  "[sender], [client], or [invoice]."))
+    if not all(isinstance(data[section], dict) for section in ('sender', 'client', 'invoice')):
+        raise InvoiceDataError("[sender], [client] and [invoice] must be tables.")
+    if items and not (isinstance(data['items'], list) and all(isinstance(item, dict) for item in data['items'])):
+        raise InvoiceDataError("[[items]] must be an array of tables.")
+
+
+# --- Currency Formatting ---
+
+DEFAULT_LOCALE = 'en_US'
+# Decimal places of amounts in currencies ISO 4217 does not list otherwise,
+# and in invoices that give no currency code.
+DEFAULT_MINOR_UNITS = 2
+CURRENCY_MINOR_UNITS = {
+    **dict.fromkeys(('BIF', 'CLP', 'DJF', 'GNF', 'ISK', 'JPY', 'KMF', 'KRW', 'PYG', 'RWF', 'UGX', 'UYI',
+                     'VND', 'VUV', 'XAF', 'XOF', 'XPF'), 0),
+    **dict.fromkeys(('BHD', 'IQD', 'JOD', 'KWD', 'LYD', 'OMR', 'TND'), 3),
+}
+# Shown for a currency code when the invoice gives no currency_symbol; other
+# codes are shown as the code itself.
+CURRENCY_SYMBOLS = {
+    'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥', 'CNY': '¥', 'INR': '₹', 'KRW': '₩', 'BRL': 'R$',
+    'CAD': 'CA$', 'AUD': 'A$', 'NZD': 'NZ$', 'MXN': 'MX$', 'ILS': '₪', 'TRY': '₺', 'UAH': '₴',
+}
+# Values remembered per formatter; long usage tables repeat the same rates.
+FORMAT_MEMO_SIZE = 4096
+NBSP = '\u00a0'
+
+
+class NumberLocale(NamedTuple):
+    """How a locale writes amounts of money."""
+    group: str             # between groups of digits
+    decimal: str
+    symbol_first: bool
+    symbol_space: str      # between the symbol and the number
+    secondary_group: int = 3  # digits per group above the first three (2 in India: 12,34,567)
+
+
+LOCALES = {
+    'en_US': NumberLocale(',', '.', True, ''),
+    'en_GB': NumberLocale(',', '.', True, ''),
+    'en_IN': NumberLocale(',', '.', True, '', 2),
+    'ja_JP': NumberLocale(',', '.', True, ''),
+    'de_DE': NumberLocale('.', ',', False, NBSP),
+    'de_CH': NumberLocale("'", '.', True, NBSP),
+    'es_ES': NumberLocale('.', ',', False, NBSP),
+    'fr_FR': NumberLocale(NBSP, ',', False, NBSP),
+    'it_IT': NumberLocale('.', ',', False, NBSP),
+    'nl_NL': NumberLocale('.', ',', True, NBSP),
+    'pt_BR': NumberLocale('.', ',', True, NBSP),
+}
+
+
+class CurrencyFormat(NamedTuple):
+    """A formatter compiled for one currency in one locale; see currency_format."""
+    code: str | None
+    symbol: str
+    minor_units: int
+    quantum: Decimal  # the smallest amount; line amounts and taxes round to it
+    format: Callable[[Decimal], str]
+
+
+@functools.lru_cache(maxsize=256)
+def currency_format(code: str | None = None, locale: str = DEFAULT_LOCALE, symbol: str | None = None) -> CurrencyFormat:
+    """
+    Compiles the formatter for amounts in a currency and locale, once per
+    process.
+
+    Decimal places, separators and symbol placement are all settled here,
+    so formatting a value is one format() call plus, outside en_US-style
+    locales, a couple of string operations; values seen before come from a
+    small memo. The sign stays with the number ($-5.00, -5,00 €). Values
+    are rounded half even for display, as format() does; amounts are
+    normally already rounded to the quantum.
+
+    Args:
+        code: ISO 4217 code, or None for invoices that give only a symbol.
+        locale: A key of LOCALES, such as 'de_DE' (or 'de-DE').
+        symbol: The symbol to show; by default the currency's, else its
+            code, else '$'.
+
+    Raises:
+        InvoiceDataError: If the locale is not one of LOCALES.
+    """
+    rules = LOCALES.get(locale.replace('-', '_'))
+    if rules is None:
+        raise InvoiceDataError(f"Unknown locale {locale!r}; use one of: {', '.join(LOCALES)}.")
+    minor_units = CURRENCY_MINOR_UNITS.get(code, DEFAULT_MINOR_UNITS)
+    space = rules.symbol_space
+    if symbol is None:
+        symbol = CURRENCY_SYMBOLS.get(code, code) if code else '$'
+        if symbol == code:
+            space = space or NBSP  # CHF 12.00, not CHF12.00
+    prefix, suffix = (symbol + space, '') if rules.symbol_first else ('', space + symbol)
+    spec = f",.{minor_units}f"
+    group, decimal = rules.group, rules.decimal
+
+    if rules.secondary_group != 3:
+        plain_spec = f".{minor_units}f"
+
+        def number(value: Decimal) -> str:
+            whole, dot, fraction = format(value, plain_spec).partition('.')
+            sign = '-' if whole.startswith('-') else ''
+            return sign + _grouped(whole[len(sign):], group, rules.secondary_group) + (decimal + fraction if dot else '')
+    elif group == ',' and decimal == '.':
+        def number(value: Decimal) -> str:
+            return format(value, spec)
+    else:
+        def number(value: Decimal) -> str:
+            whole, dot, fraction = format(value, spec).partition('.')
+            return whole.replace(',', group) + (decimal + fraction if dot else '')
+
+    memo = {}
+
+    def format_amount(value: Decimal) -> str:
+        text = memo.get(value)
+        if text is None:
+            text = prefix + number(value) + suffix
+            if value and len(memo) < FORMAT_MEMO_SIZE:  # not zero: -0 would find 0's entry
+                memo[value] = text
+        return text
+
+    return CurrencyFormat(code, symbol, minor_units, Decimal(1).scaleb(-minor_units), format_amount)
+
+
+def _grouped(digits: str, group: str, size: int) -> str:
+    """Groups digits in threes from the right, then in groups of size."""
+    groups = [digits[-3:]]
+    head = digits[:-3]
+    while head:
+        groups.append(head[-size:])
+        head = head[:-size]
+    return group.join(reversed(groups))
+
+
+def invoice_currency_format(data: dict) -> CurrencyFormat:
+    """
+    The formatter of an invoice, from its [invoice] currency, locale and
+    currency_symbol.
+
+    Raises:
+        InvoiceDataError: If the currency code or locale is invalid.
+    """
+    info = data.get('invoice', {})
+    symbol = info.get('currency_symbol')
+    return currency_format(invoice_currency(data), str(info.get('locale', DEFAULT_LOCALE)),
+                           None if symbol is None else str(symbol))
+
+
+def currency_quantum(code: str | None) -> Decimal:
+    """The smallest amount of the currency, e.g. Decimal('0.01'), or 1 for JPY."""
+    return Decimal(1).scaleb(-CURRENCY_MINOR_UNITS.get(code, DEFAULT_MINOR_UNITS))
+
+
+def format_currency(value: Decimal, symbol: str) -> str:
+    """Formats a decimal value into a currency string (e.g., $1,234.50)."""
+    return currency_format(symbol=symbol).format(value)
+
+
+# --- Pricing Rules ---
+
+# The tax class of items that do not name one.
+DEFAULT_TAX_CLASS = 'standard'
+
+
+class InvoiceLine(NamedTuple):
+    """
+    A line item converted once, for both the totals and every presentation.
+
+    exact_amount is quantity * rate less any discount, before rounding,
+    which is what the subtotals sum; amount is the rounded figure printed
+    on the line.
+    """
+    description: str
+    quantity: Decimal
+    rate: Decimal
+    amount: Decimal
+    exact_amount: Decimal
+    quantity_text: str
+    rate_text: str
+    amount_text: str
+    discount: Decimal | None = None  # percent off the line
+    tax_class: str = DEFAULT_TAX_CLASS
+
+    @property
+    def label(self) -> str:
+        """The description as shown on the invoice, noting any discount."""
+        return f"{self.description} ({self.discount}% off)" if self.discount else self.description
+
+
+def invoice_lines(items: Iterable[dict], currency: CurrencyFormat) -> Iterator[InvoiceLine]:
+    """
+    Lazily converts raw [[items]] tables into InvoiceLines.
+
+    Raises:
+        InvoiceDataError: If a quantity, rate or discount is not a number.
+    """
+    for item in items:
+        quantity = to_decimal(item.get('quantity', 0), 'quantity')
+        rate = to_decimal(item.get('rate', 0), 'rate')
+        exact_amount = quantity * rate
+        discount = item.get('discount')
+        if _given(discount):
+            discount = to_decimal(discount, 'discount')
+            exact_amount -= exact_amount * discount / 100
+        else:
+            discount = None
+        amount = exact_amount.quantize(currency.quantum, rounding=ROUND_HALF_UP)
+        yield InvoiceLine(
+            str(item.get('description', 'N/A')), quantity, rate, amount, exact_amount,
+            str(quantity), currency.format(rate), currency.format(amount),
+            discount, _tax_class(item.get('tax_class')),
+        )
+
+
+def _given(value) -> bool:
+    """Whether an optional item field has a value; CSV items leave the cell empty."""
+    return value is not None and value != ''
+
+
+def _tax_class(value) -> str:
+    return str(value or DEFAULT_TAX_CLASS)
+
+
+class Totals(NamedTuple):
+    """
+    The figures at the foot of an invoice. taxes holds (label, amount) per
+    tax; tax_rate is the classic single rate in percent, or None when the
+    invoice lists its taxes.
+    """
+    tax_rate: Decimal | None
+    subtotal: Decimal
+    tax_amount: Decimal
+    total: Decimal
+    taxes: tuple[tuple[str, Decimal], ...] = ()
+
+
+class TaxRule(NamedTuple):
+    """One tax of a [financials] table; rates are in percent."""
+    label: str
+    rate: Decimal
+    class_rates: dict[str, Decimal]  # overrides rate for these tax classes
+    compound: bool                   # charged on the line amount plus the taxes before it
+
+
+class PricingRules:
+    """
+    The taxes of a [financials] table, compiled once and applied to many
+    invoices.
+
+    Every tax is linear in a line's net amount (a compound tax is charged on
+    the amount plus the taxes before it), so for each tax class, tax k of a
+    line is its amount times factors(tax_class)[k]. An invoice's tax k is
+    then the sum of its per-class subtotals times those factors, rounded
+    half up to cents once, which for the classic tax_rate is exactly the
+    subtotal times the rate. Factors are worked out once per class.
+    """
+
+    def __init__(self, taxes: tuple[TaxRule, ...], tax_rate: Decimal | None = None):
+        self.taxes = taxes
+        self.tax_rate = tax_rate
+        self._factors = {}
+
+    @property
+    def classes(self) -> tuple[str, ...]:
+        """The tax classes with rates of their own; any other class gets the default rates."""
+        return tuple(dict.fromkeys(tax_class for tax in self.taxes for tax_class in tax.class_rates))
+
+    def factors(self, tax_class: str | None) -> tuple[Decimal, ...]:
+        """Each tax on a line of the class, per unit of the line's amount."""
+        try:
+            return self._factors[tax_class]
+        except KeyError:
+            pass
+        factors = []
+        for tax in self.taxes:
+            factor = tax.class_rates.get(tax_class, tax.rate) / Decimal(100)
+            if tax.compound:
+                factor *= 1 + sum(factors)
+            factors.append(factor)
+        factors = self._factors[tax_class] = tuple(factors)
+        return factors
+
+    def totals(self, class_subtotals: dict[str, Decimal], quantum: Decimal = Decimal("0.01")) -> Totals:
+        """
+        Applies the taxes to an invoice's unrounded subtotals per tax class,
+        rounding each to the quantum (cents, unless the currency has other
+        minor units).
+        """
+        subtotal = sum(class_subtotals.values(), Decimal(0))
+        taxes = []
+        for index, tax in enumerate(self.taxes):
+            terms = [amount * self.factors(tax_class)[index] for tax_class, amount in class_subtotals.items()]
+            base = sum(terms[1:], terms[0]) if terms else Decimal(0)
+            taxes.append((tax.label, base.quantize(quantum, rounding=ROUND_HALF_UP)))
+        amounts = [amount for _, amount in taxes]
+        tax_amount = sum(amounts[1:], amounts[0]) if amounts else Decimal(0).quantize(quantum)
+        return Totals(self.tax_rate, subtotal, tax_amount, subtotal + tax_amount, tuple(taxes))
+
+
+def pricing_rules(financials: dict) -> PricingRules:
+    """
+    The compiled rules of a [financials] table. They are cached by content,
+    so invoices sharing a table (e.g. the defaults of a multi-invoice file)
+    compile it once per process.
+
+    Raises:
+        InvoiceDataError: If the table's taxes are invalid.
+    """
+    return _compile_pricing_rules(json.dumps(financials, sort_keys=True, default=str))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pricing_rules(source: str) -> PricingRules:
+    financials = json.loads(source)
+    taxes = financials.get('taxes')
+    if taxes is None:
+        tax_rate = to_decimal(financials.get('tax_rate', 0.0), 'tax_rate')
+        return PricingRules((TaxRule(f"Tax ({tax_rate}%)", tax_rate, {}, False),), tax_rate)
+    if 'tax_rate' in financials:
+        raise InvoiceDataError("[financials] takes either a tax_rate or [[financials.taxes]], not both.")
+    if not isinstance(taxes, list) or not all(isinstance(tax, dict) for tax in taxes):
+        raise InvoiceDataError("[[financials.taxes]] must be an array of tables.")
+    rules = []
+    for tax in taxes:
+        name = str(tax.get('name', 'Tax'))
+        rate = to_decimal(tax.get('rate', 0), 'rate')
+        class_rates = tax.get('class_rates', {})
+        if not isinstance(class_rates, dict):
+            raise InvoiceDataError(f"'class_rates' of tax {name} must be a table of tax class = rate.")
+        class_rates = {tax_class: to_decimal(value, 'class_rates') for tax_class, value in class_rates.items()}
+        # A tax with one rate shows it; one that varies by class just its name.
+        label = name if class_rates else f"{name} ({rate}%)"
+        rules.append(TaxRule(label, rate, class_rates, bool(tax.get('compound', False))))
+    return PricingRules(tuple(rules))
+
+
+def class_subtotals(lines: Iterable[InvoiceLine]) -> dict[str, Decimal]:
+    """The unrounded sum of the line amounts of each tax class."""
+    subtotals = {}
+    for line in lines:
+        subtotals[line.tax_class] = subtotals.get(line.tax_class, Decimal(0)) + line.exact_amount
+    return subtotals
+
+
+def invoice_totals(lines: Iterable[InvoiceLine], financials: dict, quantum: Decimal = Decimal("0.01")) -> Totals:
+    """Sums the line items and applies the taxes of the [financials] table."""
+    return pricing_rules(financials).totals(class_subtotals(lines), quantum)
+
+
+def _totals_floor(rules: PricingRules) -> float:
+    """
+    How high the items table must end on the last page to fit the totals.
+
+    The floor never rises above the top of a continuation page: when no
+    page can hold rows as well, the totals go on a page of their own.
+    """
+    floor = LAST_PAGE_TABLE_FLOOR + max(0, len(rules.taxes) - 1) * 0.25 * inch
+    return min(floor, CONTINUED_TABLE_TOP)
+
+
+# --- Drawing ---
+
+def _draw_invoice(c: canvas.Canvas, data: dict, shared_templates: bool = False):
+    """
+    Draws one invoice onto the current page of the canvas.
+
+    Set shared_templates when the canvas will hold many invoices, so the
+    static parts of the layout are stored once for the whole document.
+    """
+    # --- Extract data from the dictionary for easier access ---
+    sender = data.get('sender', {})
+    client = data.get('client', {})
+    invoice_info = data.get('invoice', {})
+    items = data.get('items', [])
+    financials = data.get('financials', {})
+    terms = data.get('terms', {})
+
+    # --- Basic Validation ---
+    _check_sections(data)
+    context = render_context(invoice_fonts(data))
+
+    # --- Calculate Totals ---
+    # Done before drawing anything, so invalid values are rejected while the
+    # page is still blank.
+    currency = invoice_currency_format(data)
+    rules = pricing_rules(financials)
+    lines = list(invoice_lines(items, currency))
+    totals = rules.totals(class_subtotals(lines), currency.quantum)
+
+    _draw_header(c, context, sender, client, invoice_info, shared_templates)
+    c.setFont(context.bold_font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, BALANCE_DUE_Y, currency.format(totals.total))
+
+    # --- Draw Items Table ---
+    pages = list(_paginate_rows(_measured_rows(context, lines), _totals_floor(rules)))
+    for page_number, rows in enumerate(pages, start=1):
+        if page_number > 1:
+            c.showPage()
+            _draw_continued_header(c, context, sender, invoice_info)
+        if len(pages) > 1:
+            c.setFont(context.font_name, 9)
+            c.drawRightString(RIGHT_MARGIN, BOTTOM_MARGIN / 2, f"Page {page_number} of {len(pages)}")
+        table_bottom = _draw_items_page(c, context, rows, FIRST_PAGE_TABLE_TOP if page_number == 1 else CONTINUED_TABLE_TOP)
+
+    _draw_totals(c, context, table_bottom - 0.5 * inch, totals, currency)
+    _draw_terms(c, context, terms, shared_templates)
+
+
+class PageStreamWriter:
+    """
+    Writes a reportlab canvas to a binary stream a page at a time.
+
+    reportlab keeps every page's content until Canvas.save and then formats
+    the whole document in memory. Instead, each page's content stream is
+    written out as soon as the page is finished and only a reference to it
+    is kept; save() then writes the remaining objects (page dictionaries,
+    which may refer to forms defined later, fonts, forms) and a
+    cross-reference table covering both.
+    """
+
+    def __init__(self, c: canvas.Canvas, stream: BinaryIO):
+        self.doc = c._doc
+        self.stream = stream
+        self.offset = 0
+        self._write(pdfdoc.PDFFile(self.doc._pdfVersion).format(self.doc))
+        c.setPageCallBack(self._write_page)
+
+    def _write(self, data: bytes):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def _write_object(self, name: str, obj):
+        self.doc.idToOffset[name] = self.offset
+        self._write(pdfdoc.PDFIndirectObject(name, obj).format(self.doc))
+
+    def _write_page(self, page_number: int):
+        doc = self.doc
+        page = doc.Pages[-1]
+        page.check_format(doc)  # builds the content stream and resources
+        contents = doc.Reference(page.Contents)
+        self._write_object(contents.name, page.Contents)
+        page.Contents = doc.idToObject[contents.name] = contents
+        page.stream = None
+
+    def save(self, c: canvas.Canvas):
+        """Finishes the document, as Canvas.save would."""
+        if c._code:
+            c.showPage()
+        doc = self.doc
+        for font in doc.delayedFonts:
+            font.addObjects(doc)
+        doc.info.invariant = doc.invariant
+        doc.info.digest(doc.signature)
+        catalog = doc.Reference(doc.Catalog)
+        info = doc.Reference(doc.info)
+        doc.Outlines.prepare(doc, c)
+        if doc.Outlines.ready < 0:
+            doc.Catalog.Outlines = None
+
+        # Formatting an object may register new ones, so keep going until
+        # every number has been written.
+        number = 1
+        while number in doc.numberToId:
+            name = doc.numberToId[number]
+            if name not in doc.idToOffset:
+                self._write_object(name, doc.idToObject[name])
+            number += 1
+        xref = pdfdoc.PDFCrossReferenceTable()
+        xref.addsection(0, [doc.numberToId[n] for n in range(1, number)])
+        start = self.offset
+        self._write(xref.format(doc))
+        self._write(pdfdoc.PDFTrailer(startxref=start, Size=number, Root=catalog, Info=info,
+                                      ID=doc.ID()).format(doc))
+
+
+def render_invoice_stream(data: dict, items: Iterable[dict], compression: str = 'balanced',
+                          output: BinaryIO | None = None) -> bytes | None:
+    """
+    Renders an invoice whose line items come from an iterator, for usage
+    invoices with far too many rows to hold in memory.
+
+    Items are consumed once and laid out page by page; each page's rows and
+    table are released as soon as the page is emitted, and its content is
+    written to the output (see PageStreamWriter), so the working set is
+    bounded by one page. Figures that are only known at the end -- the
+    Balance Due on the first page and the page count in every footer -- are
+    drawn as PDF form XObjects that are referenced early and defined once
+    the last item has been read.
+
+    Args:
+        data (dict): The invoice data; its [[items]] section is ignored.
+        items: The line items, as dictionaries like the [[items]] tables.
+        compression (str): A key of COMPRESSION_PROFILES.
+        output (BinaryIO): Where to write the PDF as it is rendered. If
+            omitted, the document is collected in memory and returned.
+
+    Returns:
+        bytes: The complete PDF document, or None if it went to output.
+
+    Raises:
+        InvoiceDataError: If required sections are missing or values are invalid.
+        InvoiceRenderError: If reportlab fails to produce the document.
+    """
+    sender = data.get('sender', {})
+    client = data.get('client', {})
+    invoice_info = data.get('invoice', {})
+    financials = data.get('financials', {})
+    terms = data.get('terms', {})
+    _check_sections(data, items=False)
+    context = render_context(invoice_fonts(data))
+
+    currency = invoice_currency_format(data)
+    rules = pricing_rules(financials)
+    subtotals = {}
+    item_count = 0
+
+    def tallied(lines):
+        nonlocal item_count
+        for line in lines:
+            subtotals[line.tax_class] = subtotals.get(line.tax_class, Decimal(0)) + line.exact_amount
+            item_count += 1
+            yield line
+
+    buffer = io.BytesIO() if output is None else output
+    profile = COMPRESSION_PROFILES[compression]
+    try:
+        with _stream_encoding(profile):
+            c = canvas.Canvas(buffer, pagesize=letter, pageCompression=int(profile.compress))
+            c.setTitle(invoice_title(data))
+            writer = PageStreamWriter(c, buffer)
+            _draw_header(c, context, sender, client, invoice_info)
+            c.doForm('balanceDue')
+
+            page_number = 0
+            footer_x = RIGHT_MARGIN - 1 * inch
+            measured_rows = _measured_rows(context, tallied(invoice_lines(items, currency)))
+            for rows in _paginate_rows(measured_rows, _totals_floor(rules)):
+                page_number += 1
+                if page_number > 1:
+                    c.showPage()
+                    _draw_continued_header(c, context, sender, invoice_info)
+                label = f"Page {page_number} of "
+                c.setFont(context.font_name, 9)
+                c.drawString(footer_x, BOTTOM_MARGIN / 2, label)
+                c.saveState()
+                c.translate(c.stringWidth(label, context.font_name, 9), 0)
+                c.doForm('pageCount')
+                c.restoreState()
+                table_bottom = _draw_items_page(c, context, rows, FIRST_PAGE_TABLE_TOP if page_number == 1 else CONTINUED_TABLE_TOP)
+            if not item_count:
+                raise InvoiceDataError("The invoice has no line items.")
+
+            totals = rules.totals(subtotals, currency.quantum)
+            _draw_totals(c, context, table_bottom - 0.5 * inch, totals, currency)
+            _draw_terms(c, context, terms)
+            c.showPage()
+
+            c.beginForm('balanceDue')
+            c.setFont(context.bold_font_name, 10)
+            c.drawRightString(RIGHT_MARGIN, BALANCE_DUE_Y, currency.format(totals.total))
+            c.endForm()
+            c.beginForm('pageCount')
+            c.setFont(context.font_name, 9)
+            c.drawString(footer_x, BOTTOM_MARGIN / 2, str(page_number))
+            c.endForm()
+            writer.save(c)
+    except InvoiceError:
+        raise
+    except (TypeError, AttributeError) as e:
+        raise InvoiceDataError(f"Invoice data contains an invalid value: {e}") from e
+    except Exception as e:
+        raise InvoiceRenderError(f"{type(e).__name__}: {e}") from e
+    return buffer.getvalue() if output is None else None
+
+
+def iter_items(path: Path) -> Iterator[dict]:
+    """
+    Streams line items from a CSV file (with description, quantity and rate
+    columns, and optionally discount and tax_class) or a JSON-lines file (one
+    item object per line).
+    """
+    with path.open(newline='', encoding='utf-8') as stream:
+        if path.suffix.lower() == '.csv':
+            yield from csv.DictReader(stream)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise InvoiceParseError(f"{path}, line {line_number}: {e}") from e
+
+
+def _use_template(c: canvas.Canvas, context: RenderContext, name: str, draw, shared: bool):
+    """
+    Places a static page template.
+
+    When shared, the template is stored as a PDF form XObject: it is compiled
+    by draw(c, context) the first time it is used in a document and placed by
+    reference from then on, so invoices sharing a document (see
+    render_merged_invoices) carry it only once. A document holding a single
+    invoice uses each template once, where the XObject's own overhead
+    outweighs the saving, so the template is drawn inline instead.
+    Templates are kept per font family, as invoices may use different fonts.
+    """
+    if not shared:
+        draw(c, context)
+        return
+    name += context.form_suffix
+    if not c.hasForm(name):
+        c.beginForm(name)
+        draw(c, context)
+        c.endForm()
+    c.doForm(name)
+
+
+def _draw_header_template(c: canvas.Canvas, context: RenderContext):
+    """The fixed text and shapes of the first-page header."""
+    c.setFont(context.bold_font_name, 24)
+    c.drawRightString(RIGHT_MARGIN, TOP_MARGIN, "INVOICE")
+
+    c.setFont(context.bold_font_name, 10)
+    c.drawString(LEFT_MARGIN, INFO_TOP, "Bill To:")
+
+    info_x_pos = RIGHT_MARGIN - 1.5 * inch
+    c.setFont(context.font_name, 10)
+    c.drawString(info_x_pos, INFO_TOP, "Date:")
+    c.drawString(info_x_pos, INFO_TOP - 0.25 * inch, "Due Date:")
+
+    c.setFont(context.bold_font_name, 10)
+    c.setFillColor(colors.white)
+    c.rect(info_x_pos - 0.1 * inch, INFO_TOP - 0.55 * inch, 2.6 * inch, 0.3 * inch, fill=1, stroke=0)
+    c.setFillColor(colors.black)
+    c.drawString(info_x_pos, BALANCE_DUE_Y, "Balance Due:")
+
+
+def _draw_terms_template(c: canvas.Canvas, context: RenderContext):
+    c.setFont(context.bold_font_name, 10)
+    c.drawString(LEFT_MARGIN, TERMS_Y, "Terms:")
+
+
+def _draw_header(c: canvas.Canvas, context: RenderContext, sender: dict, client: dict, invoice_info: dict,
+                 shared: bool = False):
+    """Draws the first-page header, up to but not including the Balance Due amount."""
+    _use_template(c, context, 'invoiceHeader', _draw_header_template, shared)
+
+    # --- Draw Header ---
+    c.setFont(context.bold_font_name, 16)
+    c.drawString(LEFT_MARGIN, TOP_MARGIN, sender.get('name', 'Sender Name Missing').upper())
+
+    c.setFont(context.font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, TOP_MARGIN - 0.25 * inch, f"# {invoice_info.get('number', 'N/A')}")
+
+    # --- Draw Client and Date Information ---
+    # Client Info (Bill To)
+    client_name = client.get('name', 'Client Name Missing')
+    client_address = client.get('address', 'Client Address Missing').strip().split('\n')
+    
+    c.drawString(LEFT_MARGIN, INFO_TOP - 0.2 * inch, client_name)
+    
+    text_object = c.beginText(LEFT_MARGIN, INFO_TOP - 0.4 * inch)
+    text_object.setFont(context.font_name, 10)
+    text_object.setLeading(14) # Line spacing
+    for line in client_address:
+        text_object.textLine(line.strip())
+    c.drawText(text_object)
+    
+    # Date, Due Date
+    c.setFont(context.font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, INFO_TOP, str(invoice_info.get('issue_date', 'N/A')))
+    c.drawRightString(RIGHT_MARGIN, INFO_TOP - 0.25 * inch, str(invoice_info.get('due_date', 'N/A')))
+
+
+def _draw_continued_header(c: canvas.Canvas, context: RenderContext, sender: dict, invoice_info: dict):
+    """Draws the short heading of a continuation page."""
+    c.setFont(context.bold_font_name, 10)
+    c.drawString(LEFT_MARGIN, TOP_MARGIN, sender.get('name', 'Sender Name Missing').upper())
+    c.setFont(context.font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, TOP_MARGIN, f"Invoice # {invoice_info.get('number', 'N/A')} (continued)")
+
+
+def _measured_rows(context: RenderContext, lines: Iterable[InvoiceLine]) -> Iterator[tuple[list, float]]:
+    """Lazily builds each table row with its height, measured once."""
+    for line in lines:
+        # Plain descriptions are string cells, wrapped through the shared
+        # measurement cache; only those with markup pay for a Paragraph.
+        description = line.label
+        wrapped = context.description_lines(description)
+        if wrapped is not None:
+            description = '\n'.join(wrapped)
+            description_height = len(wrapped) * TABLE_LEADING
+        else:
+            description = Paragraph(description, context.description_style)
+            _, description_height = description.wrap(context.description_width, PAGE_HEIGHT)
+
+        row = [description, line.quantity_text, line.rate_text, line.amount_text]
+        yield row, max(description_height, TABLE_LEADING) + TABLE_ROW_PADDING
+
+
+def _draw_items_page(c: canvas.Canvas, context: RenderContext, rows: list, top: float) -> float:
+    """
+    Draws one page's slice of the items table; returns its bottom edge. A
+    page without rows (one holding just the totals) gets no table.
+    """
+    if not rows:
+        return top
+    if isinstance(c, PDFWriter):
+        return c.draw_items_table(context, rows, top)
+    table = _items_table(context, rows)
+    table.wrapOn(c, CONTENT_WIDTH, top)
+    table.drawOn(c, LEFT_MARGIN, top - table._height)
+    return top - table._height
+
+
+def _draw_totals(c: canvas.Canvas, context: RenderContext, y_pos: float, totals: Totals, currency: CurrencyFormat):
+    # --- Draw Totals Section ---
+    # Subtotal, one line per tax, then the total, a quarter inch apart.
+    total_y = y_pos - (len(totals.taxes) + 1) * 0.25 * inch
+    c.setFont(context.font_name, 10)
+    c.drawRightString(RIGHT_MARGIN - 1 * inch, y_pos, "Subtotal:")
+    for index, (label, _) in enumerate(totals.taxes, start=1):
+        c.drawRightString(RIGHT_MARGIN - 1 * inch, y_pos - index * 0.25 * inch, f"{label}:")
+    c.setFont(context.bold_font_name, 10)
+    c.drawRightString(RIGHT_MARGIN - 1 * inch, total_y, "Total:")
+
+    c.setFont(context.font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, y_pos, currency.format(totals.subtotal))
+    for index, (_, amount) in enumerate(totals.taxes, start=1):
+        c.drawRightString(RIGHT_MARGIN, y_pos - index * 0.25 * inch, currency.format(amount))
+    c.setFont(context.bold_font_name, 10)
+    c.drawRightString(RIGHT_MARGIN, total_y, currency.format(totals.total))
+
+
+def _draw_terms(c: canvas.Canvas, context: RenderContext, terms: dict, shared: bool = False):
+    # --- Draw Terms ---
+    _use_template(c, context, 'invoiceTerms', _draw_terms_template, shared)
+    c.setFont(context.font_name, 10)
+    notes = terms.get('notes', '')
+    lines = [notes]
+    # Notes wider than the page wrap onto further lines instead of running off it.
+    metrics = context.metrics
+    if isinstance(notes, str) and metrics.width(notes, context.font_name, 10) > CONTENT_WIDTH:
+        lines = metrics.wrap(notes, context.font_name, 10, CONTENT_WIDTH)
+    for line_number, line in enumerate(lines):
+        c.drawString(LEFT_MARGIN, TERMS_Y - 0.2 * inch - line_number * TABLE_LEADING, line)
+
+
+def _items_table(context: RenderContext, rows: list) -> Table:
+    """Builds the styled items table for one page, with its header row."""
+    table = Table([context.table_header] + rows, colWidths=context.col_widths)
+    table.setStyle(context.table_style)
+    return table
+
+
+def _paginate_rows(measured_rows: Iterable[tuple[list, float]],
+                   floor: float = LAST_PAGE_TABLE_FLOOR) -> Iterator[list]:
+    """
+    Splits (row, height) pairs into the rows of each page, in one pass.
+
+    Rows are packed greedily down to the bottom margin; the last page must
+    also leave room for the totals and terms (the table may not end below
+    floor), so rows that would run into them are carried over to a final
+    page of their own. If those rows would not end above the floor on that
+    page either (or not even one row fits above it), the last page is an
+    empty one holding just the totals. Every page gets the header
+    row again, which is accounted for here. Pages are yielded as soon as they are full, so rows
+    can come from a lazy iterator.
+    """
+    capacity = FIRST_PAGE_TABLE_TOP - BOTTOM_MARGIN - TABLE_HEADER_HEIGHT
+    page, heights, used = [], [], 0
+    for row, height in measured_rows:
+        if page and used + height > capacity:
+            yield page
+            capacity = CONTINUED_TABLE_TOP - BOTTOM_MARGIN - TABLE_HEADER_HEIGHT
+            page, heights, used = [], [], 0
+        page.append(row)
+        heights.append(height)
+        used += height
+
+    last_page_capacity = capacity - (floor - BOTTOM_MARGIN)
+    if used <= last_page_capacity:
+        yield page
+        return
+    keep, kept = 0, 0
+    while keep < len(page) and kept + heights[keep] <= last_page_capacity:
+        kept += heights[keep]
+        keep += 1
+    continued_capacity = CONTINUED_TABLE_TOP - BOTTOM_MARGIN - TABLE_HEADER_HEIGHT
+    if not keep or used - kept > continued_capacity - (floor - BOTTOM_MARGIN):
+        # The rows below the floor would not end above it on the next page
+        # either: keep them all here and give the totals an empty page.
+        yield page
+        yield []
+        return
+    yield page[:keep]
+    yield page[keep:]
+
+
+# --- Totals Engine ---
+
+# Plain decimal numbers, which the fixed-point engine reads without Decimal.
+# Other forms Decimal accepts (exponents, '.5', NaN, ...) are left to it.
+FIXED_POINT_NUMBER = re.compile(r'\s*([+-]?)(\d+)(?:\.(\d*))?\s*')
+# Digits a coefficient, and decimal places a number, may have in int64.
+FIXED_POINT_DIGITS = 18
+
+
+def _fixed_point(value) -> tuple[int, int] | None:
+    """
+    A number string as (coefficient, places), so that it equals
+    coefficient / 10**places exactly; None if only Decimal can read it.
+    """
+    if type(value) is not str:
+        return None
+    match = FIXED_POINT_NUMBER.fullmatch(value)
+    if match is None:
+        return None
+    sign, whole, fraction = match.groups()
+    digits = whole + (fraction or '')
+    if len(digits) > FIXED_POINT_DIGITS:
+        return None
+    coefficient = int(digits)
+    if sign == '-':
+        if not coefficient:
+            return None  # Decimal keeps the sign of -0, which can show as "-0.00"
+        coefficient = -coefficient
+    return coefficient, len(fraction or '')
+
+
+def _fixed_point_column(values: list) -> tuple:
+    """
+    Reads TOML/JSON numbers as int64 coefficients and decimal places, so
+    that each value equals coefficient / 10**places exactly.
+
+    Returns:
+        The coefficients, the places, and a mask of the values that were
+        read; the others (huge numbers, NaN, -0, strings in other forms,
+        non-numbers) are left to Decimal.
+    """
+    count = len(values)
+    coefficients = np.zeros(count, np.int64)
+    places = np.zeros(count, np.int64)
+    if set(map(type, values)) <= {int, float}:
+        try:
+            numbers = np.array(values, float)
+        except OverflowError:
+            return coefficients, places, np.zeros(count, bool)
+        # A float means the decimal its repr() shows, which is what Decimal
+        # reads: the one with the fewest places that converts back to it.
+        pending = (np.abs(numbers) < 2.0 ** 53) & ~((numbers == 0) & np.signbit(numbers))
+        found = np.zeros(count, bool)
+        for place in range(FIXED_POINT_DIGITS + 1):
+            scaled = np.round(numbers * 10.0 ** place)
+            hit = pending & (np.abs(scaled) < 2.0 ** 53) & (scaled / 10.0 ** place == numbers)
+            coefficients[hit] = scaled[hit]
+            places[hit] = place
+            found |= hit
+            pending &= ~hit
+            if not pending.any():
+                break
+        return coefficients, places, found
+    found = np.zeros(count, bool)
+    for index, value in enumerate(values):
+        if type(value) is int and abs(value) < 10 ** FIXED_POINT_DIGITS:
+            coefficients[index], found[index] = value, True
+        elif type(value) is float:
+            column = _fixed_point_column([value])
+            coefficients[index], places[index], found[index] = (array[0] for array in column)
+        elif (fixed := _fixed_point(value)) is not None:
+            (coefficients[index], places[index]), found[index] = fixed, True
+    return coefficients, places, found
+
+
+def _decimal_totals(items: list, rules: PricingRules, minor_units: int) -> Totals:
+    subtotals = {}
+    for quantity, rate, discount, tax_class in items:
+        amount = to_decimal(quantity, 'quantity') * to_decimal(rate, 'rate')
+        if _given(discount):
+            amount -= amount * to_decimal(discount, 'discount') / 100
+        tax_class = _tax_class(tax_class)
+        subtotals[tax_class] = subtotals.get(tax_class, Decimal(0)) + amount
+    return rules.totals(subtotals, Decimal(1).scaleb(-minor_units))
+
+
+@functools.lru_cache(maxsize=256)
+def _fixed_point_factors(rules: PricingRules) -> tuple[list, list] | None:
+    """
+    The rules' tax factors as integer coefficients: a row per tax class
+    (the default class, then rules.classes) of a coefficient per tax, each
+    tax at common places of its own (at least 2, those of cents). None if a
+    factor is not a decimal the integer engine can hold.
+    """
+    rows = []
+    for tax_class in (None, *rules.classes):
+        row = [_fixed_point(str(factor)) for factor in rules.factors(tax_class)]
+        if None in row:
+            return None
+        rows.append(row)
+    places = [max(2, *(row[index][1] for row in rows)) for index in range(len(rules.taxes))]
+    if any(place > FIXED_POINT_DIGITS for place in places):
+        return None
+    rows = [[coefficient * 10 ** (places[index] - factor_places)
+             for index, (coefficient, factor_places) in enumerate(row)] for row in rows]
+    if any(abs(coefficient) >= 2 ** 62 for row in rows for coefficient in row):
+        return None
+    return rows, places
+
+
+def _round_half_up(values, divisors):
+    """values / divisors rounded half away from zero, as ROUND_HALF_UP does."""
+    quotients = (np.abs(values) + divisors // 2) // divisors
+    return np.where(values < 0, -quotients, quotients)
+
+
+def _fixed_point_totals(rules: list[PricingRules], minor_units: list[int], counts: list[int], quantities: list,
+                        rates: list, discounts: list, tax_classes: list) -> list[Totals | None]:
+    """
+    Totals of many invoices in vectorized integer arithmetic; None for
+    invoices with numbers it cannot hold exactly, sums that could overflow
+    int64, or a tax whose sign Decimal would keep on a zero.
+
+    Each invoice is summed per tax class at the largest number of decimal
+    places among its line amounts (quantity places + rate places, plus
+    those of a discount), so the subtotals are exact, and each tax is
+    rounded to the currency's minor units from the exact sum of the
+    subtotals times the tax's factors (see PricingRules). That is the Decimal computation, without
+    its rounding steps.
+
+    Args:
+        rules: Each invoice's compiled pricing rules.
+        minor_units: The decimal places of each invoice's currency.
+        counts: The number of items of each invoice.
+        quantities, rates, discounts, tax_classes: Every item's raw values,
+            invoice after invoice, as given.
+    """
+    invoice_count = len(counts)
+    owner = np.repeat(np.arange(invoice_count), counts)
+    quantity, quantity_places, quantity_read = _fixed_point_column(quantities)
+    rate, rate_places, rate_read = _fixed_point_column(rates)
+    discounted = np.array([_given(discount) for discount in discounts], bool)
+    discount, discount_places, discount_read = _fixed_point_column(
+        [discount if given else 0 for discount, given in zip(discounts, discounted.tolist())])
+    item_read = quantity_read & rate_read & discount_read & (discount_places + 2 <= FIXED_POINT_DIGITS)
+    fits = np.bincount(owner, ~item_read, invoice_count) == 0
+    powers = 10 ** np.arange(FIXED_POINT_DIGITS + 1, dtype=np.int64)
+
+    # The factor tables of the distinct rules, padded to a common shape;
+    # each invoice picks its own by index.
+    tables = {}
+    for rule in rules:
+        if id(rule) not in tables:
+            tables[id(rule)] = (len(tables), rule, _fixed_point_factors(rule))
+    class_count = max(len(rule.classes) + 1 for _, rule, _ in tables.values())
+    tax_count = max(len(rule.taxes) for _, rule, _ in tables.values())
+    factors = np.zeros((len(tables), class_count, tax_count), np.int64)
+    factor_places = np.full((len(tables), tax_count), 2, np.int64)
+    table_read = np.ones(len(tables), bool)
+    for index, rule, table in tables.values():
+        if table is None:
+            table_read[index] = False
+            continue
+        rows, places = table
+        factors[index, :len(rows), :len(places)] = rows
+        factor_places[index, :len(places)] = places
+    table_index = np.array([tables[id(rule)][0] for rule in rules])
+    fits &= table_read[table_index]
+    factors, factor_places = factors[table_index], factor_places[table_index]
+
+    # Items of classes without rates of their own share the default row.
+    tax_class = np.zeros(len(tax_classes), np.int64)
+    if class_count > 1:
+        lookups = {key: {name: row for row, name in enumerate(rule.classes, start=1)}
+                   for key, (_, rule, _) in tables.items()}
+        tax_class[:] = [lookups[id(rules[invoice])].get(_tax_class(name), 0)
+                        for invoice, name in zip(owner.tolist(), tax_classes)]
+
+    # A discount of d percent (d = coefficient / 10**places) multiplies the
+    # amount by (100 * 10**places - coefficient) / 10**(places + 2).
+    discount_scale = powers[np.where(item_read, discount_places, 0)]
+    multiplier = np.where(discounted & item_read, 100 * discount_scale - discount, 1)
+    item_places = quantity_places + rate_places + np.where(discounted, discount_places + 2, 0)
+    places = np.zeros(invoice_count, np.int64)
+    np.maximum.at(places, owner, item_places)
+    shift = places[owner] - item_places
+
+    # Bound every intermediate in floating point before doing it in int64.
+    item_magnitude = (np.abs(quantity.astype(float) * rate.astype(float))
+                      * np.maximum(np.maximum(np.abs(multiplier.astype(float)), np.abs(discount.astype(float))), 1))
+    magnitude = np.bincount(owner, item_magnitude * 10.0 ** shift, invoice_count)
+    largest_factor = np.abs(factors.astype(float)).max(axis=(1, 2), initial=0)
+    fits &= ((magnitude * np.maximum(largest_factor, 1) < 2.0 ** 62)
+             & (places + factor_places.max(axis=1, initial=2) <= FIXED_POINT_DIGITS))
+    item_fits = fits[owner]
+
+    subtotals = np.zeros((invoice_count, class_count), np.int64)
+    np.add.at(subtotals, (owner, tax_class),
+              np.where(item_fits, quantity * rate * multiplier * powers[np.where(item_fits, shift, 0)], 0))
+    sums = np.einsum('ic,ick->ik', subtotals, factors)
+    divisor_places = places[:, None] + factor_places - np.array(minor_units, np.int64)[:, None]
+    fits &= (divisor_places >= 0).all(axis=1)
+    divisor_places = np.where(fits[:, None], divisor_places, 0)
+    taxes = _round_half_up(np.where(fits[:, None], sums, 0), powers[divisor_places])
+
+    # Decimal keeps the sign of a negative product that rounds to zero,
+    # showing "-0.00"; leave such invoices to it.
+    present = np.zeros((invoice_count, class_count), bool)
+    present[owner, tax_class] = True
+    negative_term = (present[:, :, None] & ((subtotals < 0)[:, :, None] != (factors < 0))).any(axis=1)
+    fits &= ~((taxes == 0) & negative_term).any(axis=1)
+
+    results = []
+    for rule, minor, ok, subtotal, subtotal_places, invoice_taxes in zip(
+            rules, minor_units, fits.tolist(), subtotals.sum(axis=1).tolist(), places.tolist(), taxes.tolist()):
+        if not ok:
+            results.append(None)
+            continue
+        subtotal = Decimal(subtotal).scaleb(-subtotal_places)
+        invoice_taxes = invoice_taxes[:len(rule.taxes)]
+        tax_amount = Decimal(sum(invoice_taxes)).scaleb(-minor)
+        taxes_shown = tuple((tax.label, Decimal(amount).scaleb(-minor)) for tax, amount in zip(rule.taxes, invoice_taxes))
+        results.append(Totals(rule.tax_rate, subtotal, tax_amount, subtotal + tax_amount, taxes_shown))
+    return results
+
+
+def batch_totals(invoices: Iterable[tuple[str, dict]]) -> tuple[list[tuple[str, Totals]], list[tuple[str, str]]]:
+    """
+    Computes the totals of many invoices without rendering them.
+
+    With NumPy installed, quantities, rates, discounts and tax factors are
+    read as scaled integers and the whole batch is summed and taxed in
+    vectorized int64 arithmetic. The results equal those of invoice_totals,
+    with the same ROUND_HALF_UP rounding. Invoices with numbers the integer
+    engine cannot hold exactly (more than 18 digits, sums that could
+    overflow) are computed with Decimal instead, as is every invoice when
+    NumPy is missing.
+
+    Args:
+        invoices: (label, data) pairs; the label identifies skipped invoices.
+
+    Returns:
+        (label, Totals) for every valid invoice, in input order, and
+        (label, message) for every invoice skipped because its data was
+        invalid.
+    """
+    computed = []
+    skipped = []
+    valid = []  # (label, [(quantity, rate, discount, tax class), ...], rules, minor units) with the raw values
+    for label, data in invoices:
+        try:
+            _check_sections(data)
+            rules = pricing_rules(data.get('financials', {}))
+            minor_units = CURRENCY_MINOR_UNITS.get(invoice_currency(data), DEFAULT_MINOR_UNITS)
+            items = [(item.get('quantity', 0), item.get('rate', 0), item.get('discount'), item.get('tax_class'))
+                     for item in data['items']]
+            valid.append((label, items, rules, minor_units))
+        except (TypeError, AttributeError) as e:
+            skipped.append((label, f"Invoice data contains an invalid value: {e}"))
+        except InvoiceDataError as e:
+            skipped.append((label, str(e)))
+
+    fixed = [None] * len(valid)
+    if np is not None and valid:
+        columns = list(zip(*(item for _, items, _, _ in valid for item in items)))
+        fixed = _fixed_point_totals([rules for _, _, rules, _ in valid], [minor for *_, minor in valid],
+                                    [len(items) for _, items, _, _ in valid], *map(list, columns))
+
+    for (label, items, rules, minor_units), totals in zip(valid, fixed):
+        try:
+            computed.append((label, totals or _decimal_totals(items, rules, minor_units)))
+        except InvoiceDataError as e:
+            skipped.append((label, str(e)))
+        except ArithmeticError as e:
+            skipped.append((label, f"Invoice amounts are out of range: {type(e).__name__}"))
+    return computed, skipped
+
+
+# --- Currencies ---
+
+# A CSV file of exchange rates (date,currency,rate rows) used when no other
+# is given; see ExchangeRates.
+RATES_ENV = 'INVOICE_RATES'
+CURRENCY_CODE = re.compile(r'[A-Z]{3}')
+# Formats tried, in order, on an issue_date written as text.
+ISSUE_DATE_FORMATS = ('%Y-%m-%d', '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y', '%d.%m.%Y', '%d/%m/%Y')
+
+
+def invoice_currency(data: dict) -> str | None:
+    """
+    The ISO 4217 code the invoice is billed in ([invoice] currency), or
+    None if it does not give one; every line item and total is in it.
+
+    Raises:
+        InvoiceDataError: If the code is not three letters.
+    """
+    code = data.get('invoice', {}).get('currency')
+    if code is None:
+        return None
+    if not isinstance(code, str) or not CURRENCY_CODE.fullmatch(code.strip().upper()):
+        raise InvoiceDataError(f"'currency' must be an ISO 4217 code such as EUR, got {code!r}.")
+    return code.strip().upper()
+
+
+def invoice_date(data: dict) -> datetime.date:
+    """
+    The invoice's issue_date as a date, for looking up exchange rates.
+
+    Raises:
+        InvoiceDataError: If it is missing or in none of ISSUE_DATE_FORMATS.
+    """
+    value = data.get('invoice', {}).get('issue_date')
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    for date_format in ISSUE_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value).strip(), date_format).date()
+        except ValueError:
+            continue
+    raise InvoiceDataError(f"Cannot read the issue_date {value!r} to convert currencies; use YYYY-MM-DD.")
+
+
+class ExchangeRates:
+    """
+    A local table of exchange rates, indexed by currency and then date.
+
+    Each rate is what one unit of the currency is worth in the table's
+    reference unit (list the reference currency itself with rate 1), so any
+    two currencies convert through it. A lookup takes the latest rate on or
+    before the date, so weekends and holidays use the last fixing. Factors
+    are computed once per (source, target, date).
+    """
+
+    def __init__(self, rates: dict[str, tuple[list[datetime.date], list[Decimal]]]):
+        self.rates = rates  # currency: (ascending dates, rates on those dates)
+        self._factors = {}
+
+    @classmethod
+    def from_csv(cls, path: Path) -> 'ExchangeRates':
+        """
+        Reads a CSV file with date (YYYY-MM-DD), currency and rate columns.
+
+        Raises:
+            InvoiceDataError: If the file cannot be read or a row is invalid.
+        """
+        by_currency = {}
+        try:
+            with path.open(newline='', encoding='utf-8') as stream:
+                for line_number, row in enumerate(csv.DictReader(stream), start=2):
+                    try:
+                        on = datetime.date.fromisoformat(row['date'].strip())
+                        currency = row['currency'].strip().upper()
+                        rate = Decimal(row['rate'].strip())
+                    except (KeyError, AttributeError, ValueError, InvalidOperation) as e:
+                        raise InvoiceDataError(f"{path}, line {line_number}: expected date,currency,rate "
+                                               f"columns ({type(e).__name__}: {e}).") from e
+                    if not CURRENCY_CODE.fullmatch(currency) or not rate.is_finite() or rate <= 0:
+                        raise InvoiceDataError(f"{path}, line {line_number}: invalid rate {currency} {row['rate']}.")
+                    by_currency.setdefault(currency, {})[on] = rate
+        except (OSError, UnicodeDecodeError) as e:
+            raise InvoiceDataError(f"Cannot read the exchange rates {path}: {e}") from e
+        return cls({currency: (sorted(rates), [rates[on] for on in sorted(rates)])
+                    for currency, rates in by_currency.items()})
+
+    def rate(self, currency: str, on: datetime.date) -> Decimal:
+        """
+        The currency's rate on the date, or the latest before it.
+
+        Raises:
+            InvoiceDataError: If the table has no rate for it by that date.
+        """
+        dates, rates = self.rates.get(currency, ((), ()))
+        index = bisect.bisect_right(dates, on)
+        if not index:
+            raise InvoiceDataError(f"No exchange rate for {currency} on or before {on.isoformat()}.")
+        return rates[index - 1]
+
+    def factor(self, source: str, target: str, on: datetime.date) -> Decimal:
+        """What one unit of source is worth in target on the date."""
+        key = (source, target, on)
+        if key not in self._factors:
+            self._factors[key] = Decimal(1) if source == target else self.rate(source, on) / self.rate(target, on)
+        return self._factors[key]
+
+
+@functools.lru_cache(maxsize=16)
+def exchange_rates(path: Path | None = None) -> ExchangeRates:
+    """
+    The exchange rates of a CSV file (by default, the one INVOICE_RATES
+    names), loaded once per process.
+
+    Raises:
+        InvoiceDataError: If no file is given or it is invalid.
+    """
+    if path is None:
+        if not os.environ.get(RATES_ENV):
+            raise InvoiceDataError(f"No exchange rates given; pass a rates file or set {RATES_ENV}.")
+        path = Path(os.environ[RATES_ENV])
+    return ExchangeRates.from_csv(path.expanduser())
+
+
+def convert_totals(computed: Iterable[tuple[str, dict, Totals]], target: str,
+                   rates: ExchangeRates) -> tuple[list[tuple[str, Totals]], list[tuple[str, str]]]:
+    """
+    Converts the totals of many invoices into one currency, for
+    consolidated reports.
+
+    Each distinct (currency, issue date) is looked up once for the whole
+    batch. The subtotal and every tax are converted and rounded half up to
+    the target currency's minor units, and the total is their sum, so
+    converted reports still add up.
+
+    Args:
+        computed: (label, data, totals) per invoice, as batch_totals
+            computed them from the data.
+        target: The ISO 4217 code to convert to.
+        rates: The exchange rates to use.
+
+    Returns:
+        (label, converted Totals) per invoice, in input order, and
+        (label, message) for invoices that could not be converted (no
+        currency, an unreadable date, or no rate).
+    """
+    converted = []
+    skipped = []
+    quantum = currency_quantum(target)
+    factors = {}  # (currency, date): factor, shared across the batch
+    for label, data, totals in computed:
+        try:
+            source = invoice_currency(data)
+            if source is None:
+                raise InvoiceDataError(f"The invoice has no [invoice] currency to convert to {target} from.")
+            key = (source, None if source == target else invoice_date(data))
+            if key not in factors:
+                factors[key] = Decimal(1) if source == target else rates.factor(source, target, key[1])
+        except InvoiceDataError as e:
+            skipped.append((label, str(e)))
+            continue
+        factor = factors[key]
+        if factor == 1:
+            converted.append((label, totals))
+            continue
+        try:
+            subtotal = (totals.subtotal * factor).quantize(quantum, rounding=ROUND_HALF_UP)
+            taxes = tuple((name, (amount * factor).quantize(quantum, rounding=ROUND_HALF_UP))
+                          for name, amount in totals.taxes)
+        except ArithmeticError as e:
+            skipped.append((label, f"Invoice amounts are out of range: {type(e).__name__}"))
+            continue
+        tax_amount = sum((amount for _, amount in taxes), Decimal(0).quantize(quantum))
+        converted.append((label, Totals(totals.tax_rate, subtotal, tax_amount, subtotal + tax_amount, taxes)))
+    return converted, skipped
+
+
+# --- Native PDF Writer ---
+
+BACKENDS = ('reportlab', 'native')
+
+
+class NativeUnsupported(Exception):
+    """The native writer cannot draw this invoice; reportlab has to."""
+
+
+@functools.lru_cache(maxsize=4096)
+def _pdf_number(value: float) -> str:
+    # Thousandths of a point are below any visible difference; reportlab's
+    # fp_str picks the precision per number and is far slower. The layout
+    # puts most text at the same coordinates on every invoice, hence the cache.
+    text = f"{value:.3f}".rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+_PDF_STRING_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)', '\r': '\\r'})
+
+
+def _pdf_string(text: str) -> str:
+    """A PDF literal string for text in WinAnsiEncoding."""
+    if not text.isascii():
+        try:
+            text = text.encode('cp1252').decode('latin-1')
+        except UnicodeEncodeError as e:
+            raise NativeUnsupported(f"{text!r} is outside WinAnsiEncoding") from e
+    if '(' in text or ')' in text or '\\' in text or '\r' in text:
+        text = text.translate(_PDF_STRING_ESCAPES)
+    return f"({text})"
+
+
+@functools.lru_cache(maxsize=64)
+def _pdf_color(rgb: tuple) -> str:
+    return f"{fp_str(rgb)} rg"
+
+
+def _pdf_text_string(text: str) -> str:
+    """A PDF text string (for metadata), in UTF-16 when it is not ASCII."""
+    if text.isascii():
+        return _pdf_string(text)
+    return f"<FEFF{text.encode('utf-16-be').hex().upper()}>"
+
+
+class _NativeText:
+    """The subset of reportlab's PDFTextObject the invoice layout uses."""
+
+    def __init__(self, writer: 'PDFWriter', x: float, y: float):
+        self.writer = writer
+        self.ops = [f"BT {_pdf_number(x)} {_pdf_number(y)} Td"]
+
+    def setFont(self, name: str, size: float):
+        self.ops.append(f"/{self.writer.font_resource(name)} {_pdf_number(size)} Tf")
+
+    def setLeading(self, leading: float):
+        self.ops.append(f"{_pdf_number(leading)} TL")
+
+    def textLine(self, text: str = ''):
+        self.ops.append(f"{_pdf_string(text)} Tj T*")
+
+
+class PDFWriter:
+    """
+    Writes the fixed invoice layout straight to PDF objects.
+
+    It implements just the Canvas calls the layout makes, so _draw_invoice
+    runs on it unchanged, plus a direct drawing of the items table. Text is
+    set in the standard-14 Helvetica fonts with WinAnsiEncoding, so nothing
+    is embedded. Anything else (Paragraph cells, other fonts, characters
+    outside the encoding) raises NativeUnsupported for the caller to fall
+    back to reportlab.
+    """
+
+    FONTS = {'Helvetica': 'F1', 'Helvetica-Bold': 'F2'}
+
+    def __init__(self, compression: CompressionProfile = COMPRESSION_PROFILES['balanced']):
+        self.compression = compression
+        self.title = ''
+        self.pages = []
+        self._ops = []
+        self.setFont('Helvetica', 12)  # reportlab's initial font
+        self._metrics = text_metrics()
+
+    def font_resource(self, name: str) -> str:
+        try:
+            return self.FONTS[name]
+        except KeyError:
+            raise NativeUnsupported(f"font {name} is not a standard Helvetica face") from None
+
+    def setTitle(self, title: str):
+        self.title = title
+
+    def setFont(self, name: str, size: float, leading: float | None = None):
+        self._font = (name, size)
+        self._font_op = f"BT /{self.font_resource(name)} {_pdf_number(size)} Tf"
+
+    def stringWidth(self, text: str, name: str | None = None, size: float | None = None) -> float:
+        return self._metrics.width(text, name or self._font[0], size or self._font[1])
+
+    def drawString(self, x: float, y: float, text: str):
+        self._ops.append(f"{self._font_op} {_pdf_number(x)} {_pdf_number(y)} Td {_pdf_string(text)} Tj ET")
+
+    def drawRightString(self, x: float, y: float, text: str):
+        self.drawString(x - self.stringWidth(text), y, text)
+
+    def setFillColor(self, color):
+        self._ops.append(_pdf_color(color.rgb()))
+
+    def rect(self, x: float, y: float, width: float, height: float, stroke: int = 1, fill: int = 0):
+        paint = {(1, 0): 'S', (0, 1): 'f', (1, 1): 'B'}.get((stroke, fill), 'n')
+        self._ops.append(f"{_pdf_number(x)} {_pdf_number(y)} {_pdf_number(width)} {_pdf_number(height)} re {paint}")
+
+    def beginText(self, x: float, y: float) -> _NativeText:
+        return _NativeText(self, x, y)
+
+    def drawText(self, text: _NativeText):
+        self._ops.append(' '.join(text.ops) + ' ET')
+
+    def draw_items_table(self, context: RenderContext, rows: list, top: float) -> float:
+        """
+        Draws one page of the items table as the context styles it (see
+        _items_table), and returns its bottom edge.
+        """
+        cells = [[cell.split('\n') for cell in row] if all(isinstance(cell, str) for cell in row)
+                 else None for row in rows]
+        if None in cells:
+            raise NativeUnsupported("an item description needs a Paragraph")
+        heights = [TABLE_HEADER_HEIGHT] + [max(map(len, row)) * TABLE_LEADING + TABLE_ROW_PADDING
+                                           for row in cells]
+        bottom = top - sum(heights)
+        right = LEFT_MARGIN + sum(context.col_widths)
+        edges = list(itertools.accumulate(context.col_widths, initial=LEFT_MARGIN))
+
+        self._ops.append("q")
+        self.setFillColor(colors.darkslategray)
+        self.rect(LEFT_MARGIN, top, right - LEFT_MARGIN, -TABLE_HEADER_HEIGHT, stroke=0, fill=1)
+        self.setFillColor(colors.whitesmoke)
+        self.rect(LEFT_MARGIN, top - TABLE_HEADER_HEIGHT, right - LEFT_MARGIN, bottom - top + TABLE_HEADER_HEIGHT,
+                  stroke=0, fill=1)
+        row_top = top
+        for index, (row, height) in enumerate(zip([[[label] for label in context.table_header]] + cells, heights)):
+            if index == 1:
+                self.setFillColor(colors.black)
+            self.setFont(context.bold_font_name if index == 0 else context.font_name, context.font_size)
+            bottom_padding = 12 if index == 0 else 3
+            for column, lines in enumerate(row):
+                # Vertically centred as reportlab centres string cells.
+                y = row_top - height + (bottom_padding + height - 3 + len(lines) * TABLE_LEADING) / 2 - context.font_size
+                for line in lines:
+                    if index and column:
+                        self.drawRightString(edges[column + 1] - TABLE_PADDING, y, line)
+                    else:
+                        self.drawString(edges[column] + TABLE_PADDING, y, line)
+                    y -= TABLE_LEADING
+            row_top -= height
+
+        grid = ["1 J 1 j 0 0 0 RG 1 w"]
+        left, right, bottom_edge, top_edge = map(_pdf_number, (LEFT_MARGIN, right, bottom, top))
+        for y in map(_pdf_number, itertools.accumulate(heights, lambda y, height: y - height, initial=top)):
+            grid.append(f"{left} {y} m {right} {y} l")
+        for x in map(_pdf_number, edges):
+            grid.append(f"{x} {bottom_edge} m {x} {top_edge} l")
+        self._ops.append('\n'.join(grid) + " S\nQ")
+        return bottom
+
+    def showPage(self):
+        self.pages.append('\n'.join(self._ops))
+        self._ops = []
+
+    def getpdfdata(self) -> bytes:
+        """The finished document; like Canvas.save, it ends a page still open."""
+        if self._ops or not self.pages:
+            self.showPage()
+        fonts = ''.join(f"/{resource} {index} 0 R " for index, resource in enumerate(self.FONTS.values(), start=3))
+        objects = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+                ' '.join(f"{6 + 2 * page} 0 R" for page in range(len(self.pages))), len(self.pages)),
+            *(f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>"
+              for name in self.FONTS),
+            f"<< /Title {_pdf_text_string(self.title)} /Producer (invoices) >>",
+        ]
+        for page_number, content in enumerate(self.pages):
+            stream, stream_filter = content.encode('latin-1'), ''
+            if self.compression.compress:
+                stream, stream_filter = zlib.compress(stream, self.compression.zlib_level), ' /Filter /FlateDecode'
+            objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_pdf_number(PAGE_WIDTH)} "
+                           f"{_pdf_number(PAGE_HEIGHT)}] /Resources << /Font << {fonts}>> >> "
+                           f"/Contents {7 + 2 * page_number} 0 R >>")
+            objects.append(f"<< /Length {len(stream)}{stream_filter} >>\nstream\n".encode('latin-1')
+                           + stream + b"\nendstream")
+
+        out = bytearray(b"%PDF-1.4\n%\x93\x8c\x8b\x9e\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n".encode('latin-1')
+            out += body if isinstance(body, bytes) else body.encode('latin-1')
+            out += b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+        out += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+        out += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 5 0 R >>\n"
+                f"startxref\n{xref}\n%%EOF\n").encode('latin-1')
+        return bytes(out)
+
+
+def _render_native(data: dict, compression: CompressionProfile) -> bytes | None:
+    """The invoice drawn by PDFWriter, or None if it needs reportlab."""
+    writer = PDFWriter(compression)
+    writer.setTitle(invoice_title(data))
+    try:
+        _draw_invoice(writer, data)
+        return writer.getpdfdata()
+    except NativeUnsupported:
+        return None
+
+
+# --- Output Formats ---
+
+class ComputedInvoice(NamedTuple):
+    """An invoice with its line amounts and totals worked out, ready to present."""
+    sender: dict
+    client: dict
+    invoice: dict
+    lines: list[InvoiceLine]
+    currency_symbol: str
+    currency: str | None  # ISO 4217 code, if the invoice gives one
+    currency_format: CurrencyFormat
+    tax_rate: Decimal | None  # None when the invoice lists its taxes
+    subtotal: Decimal
+    tax_amount: Decimal
+    total: Decimal
+    taxes: tuple[tuple[str, Decimal], ...]  # (label, amount) per tax
+    notes: str
+
+    def money(self, value: Decimal) -> str:
+        return self.currency_format.format(value)
+
+
+def compute_invoice(data: dict) -> ComputedInvoice:
+    """
+    Works out everything the invoice shows, without drawing it.
+
+    Raises:
+        InvoiceDataError: If required sections are missing or values are invalid.
+    """
+    _check_sections(data)
+    currency = invoice_currency_format(data)
+    lines = list(invoice_lines(data['items'], currency))
+    totals = invoice_totals(lines, data.get('financials', {}), currency.quantum)
+    return ComputedInvoice(
+        sender=data['sender'], client=data['client'], invoice=data['invoice'], lines=lines,
+        currency_symbol=currency.symbol, currency=currency.code, currency_format=currency, **totals._asdict(),
+        notes=str(data.get('terms', {}).get('notes', '')),
+    )
+
+
+def _address_lines(client: dict) -> list[str]:
+    return [line.strip() for line in client.get('address', 'Client Address Missing').strip().split('\n')]
+
+
+def render_invoice_json(invoice: ComputedInvoice) -> bytes:
+    """
+    The invoice as JSON for ledgers and reconciliation. Amounts are decimal
+    strings with the currency's decimal places (two unless it has other
+    minor units), exactly as the PDF shows them.
+    """
+    places = invoice.currency_format.minor_units
+
+    def amount(value: Decimal) -> str:
+        return f"{value:.{places}f}"
+
+    def item(line: InvoiceLine) -> dict:
+        fields = {'description': line.description, 'quantity': line.quantity_text,
+                  'rate': amount(line.rate), 'amount': amount(line.amount)}
+        if line.discount is not None:
+            fields['discount'] = str(line.discount)
+        if line.tax_class != DEFAULT_TAX_CLASS:
+            fields['tax_class'] = line.tax_class
+        return fields
+
+    document = {
+        'number': invoice.invoice.get('number'),
+        'issue_date': invoice.invoice.get('issue_date'),
+        'due_date': invoice.invoice.get('due_date'),
+        'currency_symbol': invoice.currency_symbol,
+        **({'currency': invoice.currency} if invoice.currency else {}),
+        'sender': invoice.sender,
+        'client': invoice.client,
+        'items': [item(line) for line in invoice.lines],
+        'subtotal': amount(invoice.subtotal),
+        # The single tax rate, or each of the listed taxes.
+        **({'tax_rate': str(invoice.tax_rate)} if invoice.tax_rate is not None else
+           {'taxes': [{'name': label, 'amount': amount(value)} for label, value in invoice.taxes]}),
+        'tax': amount(invoice.tax_amount),
+        'total': amount(invoice.total),
+        'notes': invoice.notes,
+    }
+    return json.dumps(document, indent=2, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+
+
+def render_invoice_text(invoice: ComputedInvoice) -> bytes:
+    """The invoice as plain text, laid out like the PDF in 80 columns."""
+    info = invoice.invoice
+    width = 80
+    lines = [
+        f"{invoice.sender.get('name', 'Sender Name Missing').upper():<{width - 8}}{'INVOICE':>8}",
+        f"{'# ' + str(info.get('number', 'N/A')):>{width}}",
+        "",
+        f"{'Bill To:':<40}{'Date:':<14}{str(info.get('issue_date', 'N/A')):>26}",
+        f"{invoice.client.get('name', 'Client Name Missing'):<40}{'Due Date:':<14}{str(info.get('due_date', 'N/A')):>26}",
+    ]
+    address = _address_lines(invoice.client)
+    lines.append(f"{address[0]:<40}{'Balance Due:':<14}{invoice.money(invoice.total):>26}")
+    lines.extend(address[1:])
+    lines.append("")
+
+    lines.append(f"{'Item':<44}{'Quantity':>12}{'Rate':>12}{'Amount':>12}")
+    lines.append("-" * width)
+    for line in invoice.lines:
+        description = textwrap.wrap(line.label, 42) or ['']
+        lines.append(f"{description[0]:<44}{line.quantity_text:>12}{line.rate_text:>12}{line.amount_text:>12}")
+        lines.extend(description[1:])
+    lines.append("-" * width)
+    for label, value in (("Subtotal:", invoice.subtotal), *((f"{name}:", tax) for name, tax in invoice.taxes),
+                         ("Total:", invoice.total)):
+        lines.append(f"{label:>{width - 16}}{invoice.money(value):>16}")
+
+    if invoice.notes:
+        lines.extend(["", "Terms:", *textwrap.wrap(invoice.notes, width)])
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def render_invoice_html(invoice: ComputedInvoice) -> bytes:
+    """The invoice as a standalone HTML page, for previews in a browser."""
+    e = html.escape
+    info = invoice.invoice
+    rows = ''.join(
+        f"<tr><td>{e(line.label)}</td><td>{line.quantity_text}</td>"
+        f"<td>{e(line.rate_text)}</td><td>{e(line.amount_text)}</td></tr>\n"
+        for line in invoice.lines
+    )
+    address = '<br>'.join(e(line) for line in _address_lines(invoice.client))
+    taxes = ''.join(
+        f"<tr><td class=right>{e(label)}:</td><td class=right>{e(invoice.money(amount))}</td></tr>\n"
+        for label, amount in invoice.taxes
+    )
+    title = e(f"Invoice #{info.get('number', 'N/A')} from {invoice.sender.get('name', 'N/A')}")
+    document = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; font-size: 10pt; max-width: 6.5in; margin: 1in auto; }}
+table {{ width: 100%; border-collapse: collapse; }}
+td {{ padding: 3px 0; vertical-align: top; }}
+.right {{ text-align: right; }}
+.items th {{ background: darkslategray; color: whitesmoke; text-align: left; padding: 3px 10px 12px; }}
+.items td {{ background: whitesmoke; padding: 3px 10px; vertical-align: middle; }}
+.items th, .items td {{ border: 1px solid black; }}
+.items td + td {{ text-align: right; }}
+</style></head>
+<body>
+<table>
+<tr><td><b style="font-size: 16pt">{e(invoice.sender.get('name', 'Sender Name Missing').upper())}</b></td>
+<td class=right><b style="font-size: 24pt">INVOICE</b><br># {e(str(info.get('number', 'N/A')))}</td></tr>
+</table>
+<table style="margin: 1in 0 0.5in">
+<tr><td rowspan=3><b>Bill To:</b><br>{e(invoice.client.get('name', 'Client Name Missing'))}<br>{address}</td>
+<td class=right>Date:</td><td class=right>{e(str(info.get('issue_date', 'N/A')))}</td></tr>
+<tr><td class=right>Due Date:</td><td class=right>{e(str(info.get('due_date', 'N/A')))}</td></tr>
+<tr><td class=right><b>Balance Due:</b></td><td class=right><b>{e(invoice.money(invoice.total))}</b></td></tr>
+</table>
+<table class=items>
+<tr><th style="width: 55%">Item</th><th>Quantity</th><th>Rate</th><th>Amount</th></tr>
+{rows}</table>
+<table style="margin-top: 0.25in">
+<tr><td class=right>Subtotal:</td><td class=right style="width: 1in">{e(invoice.money(invoice.subtotal))}</td></tr>
+{taxes}<tr><td class=right><b>Total:</b></td><td class=right><b>{e(invoice.money(invoice.total))}</b></td></tr>
+</table>
+<p style="margin-top: 0.5in"><b>Terms:</b><br>{e(invoice.notes)}</p>
+</body></html>
+"""
+    return document.encode('utf-8')
+
+
+class OutputFormat(NamedTuple):
+    render: Callable[[ComputedInvoice], bytes] | None  # None: the PDF renderer
+    content_type: str
+    suffix: str
+
+
+OUTPUT_FORMATS = {
+    'pdf': OutputFormat(None, 'application/pdf', '.pdf'),
+    'html': OutputFormat(render_invoice_html, 'text/html; charset=utf-8', '.html'),
+    'text': OutputFormat(render_invoice_text, 'text/plain; charset=utf-8', '.txt'),
+    'json': OutputFormat(render_invoice_json, 'application/json', '.json'),
+}
+
+
+def render_output(data: dict, output_format: str = 'pdf', backend: str = 'reportlab',
+                  compression: str = 'balanced') -> bytes:
+    """
+    Renders the invoice in one of OUTPUT_FORMATS.
+
+    The HTML, text and JSON formats present compute_invoice()'s result and
+    never touch the PDF machinery, so they are cheap enough for previews
+    and reconciliation jobs.
+
+    Args:
+        data (dict): A dictionary containing all the invoice data.
+        output_format (str): A key of OUTPUT_FORMATS.
+        backend (str): The PDF backend (see render_invoice).
+        compression (str): The PDF compression profile (see render_invoice).
+
+    Raises:
+        InvoiceDataError: If required sections are missing or values are invalid.
+        InvoiceRenderError: If the document cannot be produced.
+    """
+    render = OUTPUT_FORMATS[output_format].render
+    if render is None:
+        return render_invoice(data, backend, compression)
+    try:
+        return render(compute_invoice(data))
+    except InvoiceError:
+        raise
+    except (TypeError, AttributeError) as e:
+        raise InvoiceDataError(f"Invoice data contains an invalid value: {e}") from e
+    except Exception as e:
+        raise InvoiceRenderError(f"{type(e).__name__}: {e}") from e
+
+
+class RenderOptions(NamedTuple):
+    """The render_output arguments a batch, stream or cache applies to every invoice."""
+    output_format: str = 'pdf'
+    backend: str = 'reportlab'
+    compression: str = 'balanced'
+
+    @property
+    def cache_variant(self) -> str:
+        # The defaults keep the variant (and so the cache keys) of plain PDFs.
+        return '' if self == RenderOptions() else ':'.join(self)
+
+
+def _render_options(args: argparse.Namespace) -> RenderOptions:
+    return RenderOptions(args.output_format, args.backend, args.compression)
+
+
+def _add_render_options(parser: argparse.ArgumentParser, *names: str, subject: str = 'each invoice'):
+    """
+    Adds the --backend, --output-format and --compression arguments that
+    _render_options reads, or only those named (by their dest, such as
+    'compression'). subject is what --output-format writes.
+    """
+    names = names or RenderOptions._fields
+    if 'backend' in names:
+        parser.add_argument(
+            "--backend",
+            choices=BACKENDS,
+            default='reportlab',
+            help="native writes simple invoices directly, many times faster;\n"
+                 "others still go through reportlab (default: %(default)s)."
+        )
+    if 'output_format' in names:
+        parser.add_argument(
+            "--output-format",
+            choices=OUTPUT_FORMATS,
+            default='pdf',
+            help=f"Write {subject} as a PDF, an HTML preview, plain text or\n"
+                 "JSON for ledgers (default: %(default)s)."
+        )
+    if 'compression' in names:
+        parser.add_argument(
+            "--compression",
+            choices=COMPRESSION_PROFILES,
+            default='balanced',
+            help="PDF size/speed trade-off: fast skips compression, small gives\n"
+                 "the smallest files (default: %(default)s; see 'bench')."
+        )
+
+
+# --- Output Cache ---
+
+# Part of every cache key. Bump it whenever a change to the drawing code
+# alters the PDF produced for the same data, so stale entries stop matching.
+RENDERER_VERSION = 9
+
+# The sections render_invoice reads; anything else in the file (extra tables,
+# comments, key order, formatting) does not affect the output or the key.
+INVOICE_SECTIONS = ('sender', 'client', 'invoice', 'items', 'financials', 'terms')
+
+
+class RenderCache:
+    """
+    Content-addressed store of rendered PDFs.
+
+    Entries are keyed by a hash of the normalized invoice data and the
+    renderer version. A hit hard-links (or copies) the stored PDF to the
+    output path instead of drawing it again, so outputs must only ever be
+    replaced, not rewritten (see replacing_file). The store is bounded to
+    max_bytes; the least recently used entries (by mtime, refreshed on every
+    hit) are evicted first. Several processes may share one directory.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(data: dict, variant: str = '') -> str:
+        """Hashes what the renderer consumes, plus any output variant."""
+        normalized = {section: data.get(section) for section in INVOICE_SECTIONS}
+        fonts = font_paths(data)
+        if fonts is not None:
+            normalized['fonts'] = fonts
+        document = json.dumps([RENDERER_VERSION, variant, normalized],
+                              sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def _entries(self):
+        for path in self.directory.glob('*/*.pdf'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime_ns, stat.st_size
+
+    def fetch(self, key: str, output_path: Path) -> bool:
+        """Materializes a cached PDF at output_path; returns False on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return False
+        output_path.unlink(missing_ok=True)
+        try:
+            os.link(path, output_path)
+        except OSError:
+            shutil.copyfile(path, output_path)
+        self.stats['hits'] += 1
+        return True
+
+    def store(self, key: str, pdf: bytes):
+        """Adds a rendered PDF, evicting old entries if over the size bound."""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_bytes(pdf)
+        os.replace(temp_path, path)
+        self.size += len(pdf)
+        if self.size > self.max_bytes:
+            self.prune()
+
+    def prune(self):
+        """Evicts least recently used entries until the store is 90% full."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self.size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self.size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self.size -= size
+            self.stats['evictions'] += 1
+
+    def render_to(self, data: dict, output_path: Path, options: RenderOptions = RenderOptions()) -> bool:
+        """
+        Writes the invoice PDF (or other output format) to output_path, from
+        the cache when possible.
+
+        Returns:
+            bool: True if the document came from the cache.
+        """
+        key = self.key(data, options.cache_variant)
+        if self.fetch(key, output_path):
+            return True
+        pdf = render_output(data, *options)
+        write_output(output_path, pdf)
+        self.store(key, pdf)
+        return False
+
+
+# --- Batch Mode ---
+
+def expand_inputs(patterns: list[str]) -> list[Path]:
+    """
+    Expands the batch command line into a sorted, de-duplicated list of files.
+
+    Each entry may be a plain file, a directory (searched recursively for
+    *.toml) or a glob pattern; '**' matches any number of sub-directories.
+    """
+    found = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            found.update(p for p in path.rglob('*.toml') if p.is_file())
+        elif path.is_file():
+            found.add(path)
+        else:
+            found.update(Path(p) for p in glob.glob(pattern, recursive=True) if Path(p).is_file())
+    return sorted(found)
+
+
+def batch_output_path(input_path: Path, output_dir: Path | None, index: int | None = None,
+                      suffix: str = '.pdf') -> Path:
+    """
+    Where batch and watch modes save a PDF: [input-name].pdf, or
+    [input-name]-[N].pdf for the N-th invoice of a multi-invoice file.
+    """
+    name = input_path.stem if index is None else f"{input_path.stem}-{index + 1}"
+    return (output_dir or input_path.parent) / f"{name}{suffix}"
+
+
+class BatchTask(NamedTuple):
+    """One invoice to render, located by byte range so workers load it themselves."""
+    path: Path
+    index: int
+    fmt: str
+    start: int
+    end: int
+    defaults_end: int
+    output_path: Path
+
+    @property
+    def label(self) -> str:
+        return str(self.path) if self.fmt in ('toml', 'json') else f"{self.path} #{self.index + 1}"
+
+
+# Invoices per batch work item. Hand out work in chunks so IPC overhead stays
+# small next to render time; inputs are located and submitted lazily, so the
+# number of invoices is not known up front and memory stays flat however many
+# the files hold.
+BATCH_CHUNK_SIZE = 8
+
+# Per-process cache of a batch worker, set up by _init_batch_worker.
+_batch_cache = None
+_batch_options = RenderOptions()
+
+
+def _init_batch_worker(cache_dir: Path | None, cache_size: int, text_cache_size: int = TEXT_CACHE_SIZE,
+                       options: RenderOptions = RenderOptions()):
+    global _batch_cache, _batch_options
+    _batch_options = options
+    text_metrics().max_entries = text_cache_size
+    render_context()  # Build the default styles before the first task.
+    if cache_dir:
+        _batch_cache = RenderCache(cache_dir, cache_size)
+
+
+def _iter_batch_tasks(files: list[Path], output_dir: Path | None, failures: list,
+                      suffix: str = '.pdf') -> Iterator[BatchTask]:
+    """Locates every invoice in the input files, lazily and without parsing them."""
+    for path in files:
+        try:
+            with path.open('rb') as stream:
+                for record in split_invoices(stream, invoice_file_format(path)):
+                    index = None if record.fmt in ('toml', 'json') else record.index
+                    yield BatchTask(path, record.index, record.fmt, record.start, record.end,
+                                    len(record.defaults), batch_output_path(path, output_dir, index, suffix))
+        except OSError as e:
+            failures.append((str(path), str(e)))
+
+
+def _load_batch_task(task: BatchTask) -> dict:
+    """Reads and parses the invoice a task points at."""
+    with task.path.open('rb') as stream:
+        defaults = stream.read(task.defaults_end)
+        stream.seek(task.start)
+        source = stream.read(task.end - task.start)
+    return parse_invoice_record(InvoiceRecord(task.index, task.fmt, task.start, task.end, source, defaults),
+                                task.path.parent)
+
+
+def _render_batch_task(task: BatchTask) -> tuple[str, str | None, bool | None]:
+    """
+    Worker: parses and renders a single invoice.
+
+    Every failure is caught and reported back as a message, so one broken
+    invoice never takes down the worker or the rest of the batch.
+
+    Returns:
+        The invoice label, the error message (None on success) and whether
+        the PDF came from the cache (None when no cache is in use).
+    """
+    try:
+        data = _load_batch_task(task)
+        if _batch_cache:
+            return task.label, None, _batch_cache.render_to(data, task.output_path, _batch_options)
+        write_output(task.output_path, render_output(data, *_batch_options))
+        return task.label, None, None
+    except (InvoiceError, OSError) as e:
+        return task.label, str(e), None
+
+
+def _render_batch_chunk(tasks: tuple[BatchTask, ...]) -> tuple[int, dict, list[tuple[str, str | None, bool | None]]]:
+    results = [_render_batch_task(task) for task in tasks]
+    # The worker's running text cache counters, so the parent can total them.
+    return os.getpid(), dict(text_metrics().stats), results
+
+
+def imap_bounded(executor, fn, iterable, window: int):
+    """
+    Like executor.map, but submits lazily with at most window calls pending,
+    so arbitrarily long inputs are consumed in constant memory.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def batch_main(argv: list[str]):
+    """Renders many TOML invoices in one process tree using a worker pool."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} batch",
+        description="Generate PDF invoices for many TOML files in parallel.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="TOML files, directories or glob patterns (e.g. 'invoices/**/*.toml').\n"
+             "Quote patterns containing '**' so the shell does not expand them.\n"
+             "A TOML file may hold many invoices as [[invoices]] tables, and\n"
+             ".jsonl/.ndjson files hold one JSON invoice per line; their PDFs\n"
+             "are saved as [input-name]-[N].pdf."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "-d", "--output-dir",
+        type=Path,
+        help="Directory to save the PDFs in, as [input-name].pdf.\n"
+             "If not provided, each PDF is saved next to its TOML file."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Reuse PDFs rendered earlier for identical invoice data,\n"
+             "keeping them in this directory."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        metavar="MB",
+        help="Size bound of the cache; least recently used PDFs are\n"
+             "evicted beyond it (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--text-cache-size",
+        type=int,
+        default=TEXT_CACHE_SIZE,
+        metavar="ENTRIES",
+        help="Measured widths and wrapped descriptions each worker keeps\n"
+             "in memory (default: %(default)s). The summary reports its hit rate."
+    )
+    _add_render_options(parser)
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Error: No TOML files matched the given inputs.", file=sys.stderr)
+        sys.exit(1)
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = max(1, args.jobs)
+    failures = []
+    suffix = OUTPUT_FORMATS[args.output_format].suffix
+    chunks = itertools.batched(_iter_batch_tasks(files, args.output_dir, failures, suffix),
+                               BATCH_CHUNK_SIZE)
+
+    started = time.perf_counter()
+    rendered = hits = misses = 0
+    text_stats = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                             initargs=(args.cache_dir, args.cache_size * 1024 * 1024,
+                                       max(1, args.text_cache_size), _render_options(args))) as executor:
+        for pid, worker_text_stats, results in imap_bounded(executor, _render_batch_chunk, chunks,
+                                                            window=jobs * 4):
+            text_stats[pid] = worker_text_stats
+            for label, error, cached in results:
+                if error:
+                    failures.append((label, error))
+                    continue
+                rendered += 1
+                if cached is not None:
+                    hits += cached
+                    misses += not cached
+    elapsed = time.perf_counter() - started
+
+    for label, error in failures:
+        print(f"{label}: {error}", file=sys.stderr)
+
+    total = rendered + len(failures)
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Generated {rendered} of {total} invoices in {elapsed:.2f}s "
+          f"({rate:.1f}/s, {jobs} worker{'s' if jobs != 1 else ''}).")
+    if args.cache_dir:
+        lookups = hits + misses
+        hit_rate = 100 * hits / lookups if lookups else 0.0
+        print(f"   Cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate).")
+    text_hits = sum(stats['hits'] for stats in text_stats.values())
+    text_lookups = text_hits + sum(stats['misses'] for stats in text_stats.values())
+    if text_lookups:
+        text_evictions = sum(stats['evictions'] for stats in text_stats.values())
+        print(f"   Text cache: {100 * text_hits / text_lookups:.1f}% hit rate over {text_lookups} "
+              f"lookups, {text_evictions} evictions.")
+    if failures:
+        print(f"❌ {len(failures)} invoice(s) failed.", file=sys.stderr)
+        sys.exit(1)
+
+
+# --- Totals Report ---
+
+TOTALS_FORMATS = ('csv', 'jsonl')
+TOTALS_FIELDS = ('number', 'client', 'currency', 'subtotal', 'tax', 'total')
+# Added by --currency: the figures converted into the report currency.
+TOTALS_CONVERTED_FIELDS = ('report_currency', 'report_subtotal', 'report_tax', 'report_total')
+# Totals are cheap next to parsing, so workers take large chunks: IPC stays
+# small and batch_totals gets whole arrays to work on.
+TOTALS_CHUNK_SIZE = 512
+
+
+def _totals_row(data: dict, totals: Totals, report_currency: str | None = None,
+               converted: Totals | None = None) -> dict:
+    """
+    A report row; amounts are decimal strings with their currency's decimal
+    places, as printed.
+    """
+    client = data['client']
+    currency = invoice_currency(data)
+    places = CURRENCY_MINOR_UNITS.get(currency, DEFAULT_MINOR_UNITS)
+    row = {
+        'number': data['invoice'].get('number') if isinstance(data['invoice'], dict) else None,
+        'client': client.get('name') if isinstance(client, dict) else None,
+        'currency': currency,
+        'subtotal': f"{totals.subtotal:.{places}f}",
+        'tax': f"{totals.tax_amount:.{places}f}",
+        'total': f"{totals.total:.{places}f}",
+    }
+    if converted is not None:
+        places = CURRENCY_MINOR_UNITS.get(report_currency, DEFAULT_MINOR_UNITS)
+        row.update(zip(TOTALS_CONVERTED_FIELDS, (report_currency, f"{converted.subtotal:.{places}f}",
+                                                 f"{converted.tax_amount:.{places}f}", f"{converted.total:.{places}f}")))
+    return row
+
+
+def _totals_batch_chunk(tasks: tuple[BatchTask, ...], report_currency: str | None = None,
+                        rates_path: Path | None = None) -> list[tuple[str, dict | None, str | None]]:
+    """
+    Worker: parses a chunk of invoices and computes their totals together,
+    converted into report_currency (with the rates of rates_path, loaded
+    once per worker) if given.
+
+    Returns:
+        (label, row, None) or (label, None, error message) per task, in order.
+    """
+    results = [None] * len(tasks)
+    invoices = []
+    for index, task in enumerate(tasks):
+        try:
+            invoices.append((index, _load_batch_task(task)))
+        except (InvoiceError, OSError) as e:
+            results[index] = (task.label, None, str(e))
+    computed, skipped = batch_totals(invoices)
+    data = dict(invoices)
+    converted = {}
+    if report_currency is not None:
+        computed = dict(computed)
+        conversions, failed = convert_totals(((index, data[index], totals) for index, totals in computed.items()),
+                                             report_currency, exchange_rates(rates_path))
+        converted = dict(conversions)
+        skipped.extend(failed)
+        computed = [(index, totals) for index, totals in computed.items() if index in converted]
+    for index, totals in computed:
+        try:
+            row = _totals_row(data[index], totals, report_currency, converted.get(index))
+        except InvoiceDataError as e:
+            skipped.append((index, str(e)))
+            continue
+        results[index] = (tasks[index].label, row, None)
+    for index, error in skipped:
+        results[index] = (tasks[index].label, None, error)
+    return results
+
+
+def totals_main(argv: list[str]):
+    """Computes the totals of many invoices in parallel, without rendering them."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} totals",
+        description="Report the number, client, currency, subtotal, tax and total of many\n"
+                    "invoices as CSV or JSON lines, without rendering anything.\n\n"
+                    "  main.py totals 'invoices/**/*.toml' > totals.csv\n"
+                    "  main.py totals 'invoices/**/*.toml' --currency EUR --rates rates.csv",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="TOML/JSON/JSONL files, directories or glob patterns, as for 'batch'."
+    )
+    parser.add_argument(
+        "-f", "--format",
+        choices=TOTALS_FORMATS,
+        default='csv',
+        help="csv with a header row, or one JSON object per line (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        help="File to write the report to (default: stdout)."
+    )
+    parser.add_argument(
+        "--currency",
+        type=str.upper,
+        help="Also report each invoice's figures converted into this ISO 4217\n"
+             "currency, at the rate of its issue date. Invoices need an\n"
+             "[invoice] currency."
+    )
+    parser.add_argument(
+        "--rates",
+        type=Path,
+        help="CSV of exchange rates for --currency, with date (YYYY-MM-DD),\n"
+             f"currency and rate columns (default: ${RATES_ENV})."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs)."
+    )
+    args = parser.parse_args(argv)
+    if args.currency is not None:
+        if not CURRENCY_CODE.fullmatch(args.currency):
+            parser.error(f"--currency must be an ISO 4217 code such as EUR, got {args.currency!r}")
+        try:
+            exchange_rates(args.rates)  # fail early on a missing or invalid file
+        except InvoiceDataError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Error: No invoice files matched the given inputs.", file=sys.stderr)
+        sys.exit(1)
 
-# --- Constants for PDF Layout ---
-PAGE_WIDTH, PAGE_HEIGHT = letter
-TOP_MARGIN = PAGE_HEIGHT - inch
-BOTTOM_MARGIN = inch
-LEFT_MARGIN = inch
-RIGHT_MARGIN = PAGE_WIDTH - inch
-CONTENT_WIDTH = PAGE_WIDTH - (2 * inch)
+    jobs = max(1, args.jobs)
+    failures = []
+    chunks = itertools.batched(_iter_batch_tasks(files, None, failures), TOTALS_CHUNK_SIZE)
+    started = time.perf_counter()
+    reported = 0
+    try:
+        output = args.output.open('w', newline='', encoding='utf-8') if args.output else contextlib.nullcontext(sys.stdout)
+    except OSError as e:
+        print(f"Error: Could not write the report: {e}", file=sys.stderr)
+        sys.exit(1)
+    with output as stream, ProcessPoolExecutor(max_workers=jobs) as executor:
+        if args.format == 'csv':
+            writer = csv.writer(stream)
+            writer.writerow(TOTALS_FIELDS + (TOTALS_CONVERTED_FIELDS if args.currency else ()))
+            write_row = lambda row: writer.writerow(row.values())
+        else:
+            write_row = lambda row: stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        work = functools.partial(_totals_batch_chunk, report_currency=args.currency, rates_path=args.rates)
+        for results in imap_bounded(executor, work, chunks, window=jobs * 2):
+            for label, row, error in results:
+                if error:
+                    failures.append((label, error))
+                    continue
+                write_row(row)
+                reported += 1
+    elapsed = time.perf_counter() - started
 
+    for label, error in failures:
+        print(f"{label}: {error}", file=sys.stderr)
+    rate = reported / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Totalled {reported} of {reported + len(failures)} invoices in {elapsed:.2f}s "
+          f"({rate:.0f}/s, {jobs} worker{'s' if jobs != 1 else ''}).", file=sys.stderr)
+    if failures:
+        print(f"❌ {len(failures)} invoice(s) failed.", file=sys.stderr)
+        sys.exit(1)
 
-def format_currency(value: Decimal, symbol: str) -> str:
-    """Formats a decimal value into a currency string (e.g., $1,234.50)."""
-    return f"{symbol}{value:,.2f}"
 
+# --- Merged Output ---
+
+def _iter_merge_inputs(files: list[Path], failures: list) -> Iterator[tuple[str, dict]]:
+    """Streams (label, data) for every invoice in the files, noting unreadable ones."""
+    for path in files:
+        try:
+            with path.open('rb') as stream:
+                for record in split_invoices(stream, invoice_file_format(path)):
+                    label = str(path) if record.fmt in ('toml', 'json') else f"{path} #{record.index + 1}"
+                    try:
+                        yield label, parse_invoice_record(record, path.parent)
+                    except (InvoiceParseError, InvoiceDataError) as e:
+                        failures.append((label, str(e)))
+        except OSError as e:
+            failures.append((str(path), str(e)))
+
+
+def merge_main(argv: list[str]):
+    """Renders many invoices into a single multi-page PDF."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} merge",
+        description="Generate one multi-page PDF holding many invoices, one per page.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="TOML/JSON/JSONL files, directories or glob patterns, as for 'batch'."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        required=True,
+        help="Path to save the merged PDF file."
+    )
+    parser.add_argument(
+        "--title",
+        default="Invoices",
+        help="Document title (default: %(default)s)."
+    )
+    _add_render_options(parser, 'compression')
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Error: No invoice files matched the given inputs.", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    failures = []
+    try:
+        pdf, skipped = render_merged_invoices(_iter_merge_inputs(files, failures), args.title, args.compression)
+        write_output(args.output, pdf)
+    except (InvoiceError, OSError) as e:
+        for label, error in failures:
+            print(f"{label}: {error}", file=sys.stderr)
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    failures.extend(skipped)
+    for label, error in failures:
+        print(f"{label}: {error}", file=sys.stderr)
+    print(f"✅ Merged invoices into {args.output} ({len(pdf) / 1024:.0f} KiB) in {elapsed:.2f}s.")
+    if failures:
+        print(f"❌ {len(failures)} invoice(s) skipped.", file=sys.stderr)
+        sys.exit(1)
+
+
+# --- Benchmark ---
+
+def bench_main(argv: list[str]):
+    """Measures output size and render time of every compression profile."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} bench",
+        description="Render a sample corpus once per compression profile and report\n"
+                    "bytes and milliseconds per invoice.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="TOML/JSON/JSONL files, directories or glob patterns, as for 'batch'."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default='reportlab',
+        help="PDF writer to measure (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=3,
+        help="Renders per invoice and profile; the fastest is kept (default: %(default)s)."
+    )
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    # Rendering each invoice once both skips the ones that cannot be rendered
+    # and warms fonts, styles and the text cache, so the first profile is not
+    # penalised.
+    failures = []
+    corpus = []
+    for label, data in _iter_merge_inputs(expand_inputs(args.inputs), failures):
+        try:
+            render_invoice(data, args.backend)
+        except InvoiceError as e:
+            failures.append((label, str(e)))
+            continue
+        corpus.append(data)
+    for label, error in failures:
+        print(f"{label}: {error}", file=sys.stderr)
+    if failures:
+        print(f"❌ {len(failures)} invoice(s) skipped.", file=sys.stderr)
+    if not corpus:
+        print("Error: No invoices to benchmark.", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{len(corpus)} invoice(s), {args.backend} backend, best of {args.repeat}")
+    print(f"{'profile':<10} {'total KiB':>10} {'bytes/inv':>10} {'ms/inv':>8}")
+    for name in COMPRESSION_PROFILES:
+        size = 0
+        elapsed = 0.0
+        for data in corpus:
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                pdf = render_invoice(data, args.backend, name)
+                took = time.perf_counter() - started
+                best = took if best is None else min(best, took)
+            size += len(pdf)
+            elapsed += best
+        print(f"{name:<10} {size / 1024:>10.1f} {size / len(corpus):>10.0f} "
+              f"{elapsed * 1000 / len(corpus):>8.2f}")
+
+
+# --- Stream Mode ---
+
+ARCHIVE_FORMATS = ('zip', 'tar', 'tgz')
 
-def generate_invoice_pdf(data: dict, output_path: Path):
+
+def _render_stream_record(record: InvoiceRecord, options: RenderOptions = RenderOptions(),
+                          ) -> tuple[int, str | None, bytes | None, str | None]:
     """
-    Generates the invoice PDF from the parsed TOML data.
+    Worker: parses and renders one streamed record.
+
+    Returns:
+        The record index, the archive member name and the PDF, or an error
+        message in place of the last two.
+    """
+    try:
+        data = parse_invoice_record(record)
+        name = f"{record.index + 1:06d}-{default_output_name(data, OUTPUT_FORMATS[options.output_format].suffix)}"
+        return record.index, name, render_output(data, *options), None
+    except InvoiceError as e:
+        return record.index, None, None, str(e)
+    except (TypeError, AttributeError) as e:
+        return record.index, None, None, f"Invoice data contains an invalid value: {e}"
+
+
+class ArchiveWriter:
+    """Appends files to a ZIP or tar archive written to a non-seekable stream."""
+
+    def __init__(self, stream: BinaryIO, fmt: str):
+        self.fmt = fmt
+        self.mtime = time.time()
+        if fmt == 'zip':
+            # PDF streams are already compressed, so members are stored as-is.
+            self.archive = zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED)
+        else:
+            self.archive = tarfile.open(fileobj=stream, mode='w|gz' if fmt == 'tgz' else 'w|')
+
+    def add(self, name: str, payload: bytes):
+        if self.fmt == 'zip':
+            info = zipfile.ZipInfo(name, time.localtime(self.mtime)[:6])
+            self.archive.writestr(info, payload)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(payload)
+            info.mtime = self.mtime
+            self.archive.addfile(info, io.BytesIO(payload))
+
+    def close(self):
+        self.archive.close()
+
+
+def stream_main(argv: list[str]):
+    """Renders invoices read from stdin into an archive written to stdout."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} stream",
+        description="Read invoices from stdin and write their PDFs to stdout as an archive.\n\n"
+                    "  cat invoices.jsonl | main.py stream --format zip > invoices.zip",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "-f", "--format",
+        choices=ARCHIVE_FORMATS,
+        default='zip',
+        help="Archive format to write (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-i", "--input-format",
+        choices=('jsonl', 'toml'),
+        default='jsonl',
+        help="jsonl: one JSON invoice per line; toml: [[invoices]] tables\n"
+             "or a single invoice (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs)."
+    )
+    _add_render_options(parser)
+    args = parser.parse_args(argv)
+
+    if sys.stdout.isatty():
+        print("Error: Refusing to write an archive to a terminal; redirect stdout.", file=sys.stderr)
+        sys.exit(1)
+
+    jobs = max(1, args.jobs)
+    archive = ArchiveWriter(sys.stdout.buffer, args.format)
+    records = split_invoices(sys.stdin.buffer, args.input_format)
+    rendered = failed = 0
+    # Records flow through a bounded window, so each PDF is appended as soon
+    # as it (and everything before it) is done, and memory stays flat.
+    with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up) as executor:
+        render = functools.partial(_render_stream_record, options=_render_options(args))
+        for index, name, pdf, error in imap_bounded(executor, render, records, window=jobs * 4):
+            if error:
+                print(f"Error: invoice #{index + 1}: {error}", file=sys.stderr)
+                failed += 1
+                continue
+            archive.add(name, pdf)
+            rendered += 1
+    archive.close()
+    sys.stdout.buffer.flush()
+
+    print(f"✅ Streamed {rendered} of {rendered + failed} invoices.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+# --- Render Daemon ---
+
+# Wire format shared by the daemon and its clients. Every message is a frame:
+# a one-byte kind, a 4-byte big-endian payload length, then the payload.
+# Requests carry the invoice document (kind b't' for TOML, b'j' for JSON);
+# replies carry either the PDF (b'P') or a JSON-encoded error (b'E').
+FRAME_HEADER = struct.Struct('!cI')
+REQUEST_KINDS = {'toml': b't', 'json': b'j'}
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+# Seconds a connection closed on a framing error keeps discarding input.
+HANG_UP_TIMEOUT = 5.0
+
+# A minimal invoice rendered once at worker start-up, so the first real
+# request does not pay for loading fonts and building reportlab's caches.
+WARM_UP_INVOICE = {
+    'sender': {'name': 'Warm Up'},
+    'client': {'name': 'Warm Up', 'address': 'Nowhere'},
+    'invoice': {'number': 0},
+    'items': [{'description': 'Warm up', 'quantity': 1, 'rate': 1}],
+}
+
+_ERROR_TYPES = {cls.__name__: cls for cls in (InvoiceError, InvoiceParseError,
+                                               InvoiceDataError, InvoiceRenderError)}
+
+
+def warm_up():
+    """Renders a throwaway invoice so later renders in this process start hot."""
+    render_invoice(WARM_UP_INVOICE)
+
+
+def parse_request(payload: bytes, fmt: str) -> dict:
+    """
+    Parses an invoice sent to the daemon or the HTTP service.
+
+    Clients must not make the server open files of their choosing, so an
+    invoice with a [fonts] table is refused: the server's fonts come from
+    its INVOICE_FONTS config alone.
+
+    Raises:
+        InvoiceParseError: If the document cannot be parsed.
+        InvoiceDataError: If it has a [fonts] table.
+    """
+    data = parse_invoice(payload, fmt)
+    if 'fonts' in data:
+        raise InvoiceDataError("[fonts] is not accepted in render requests; "
+                               "set INVOICE_FONTS where the server runs instead.")
+    return data
+
+
+def default_socket_path() -> Path:
+    """The socket used when --socket is not given: one per user."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return Path(runtime_dir) / f"invoices-{os.getuid()}.sock"
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes | None:
+    """Reads exactly size bytes, or returns None if the peer closes first."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = conn.recv(min(size - len(buffer), 1024 * 1024))
+        if not chunk:
+            return None
+        buffer += chunk
+    return bytes(buffer)
+
+
+def _send_frame(conn: socket.socket, kind: bytes, payload: bytes):
+    conn.sendall(FRAME_HEADER.pack(kind, len(payload)))
+    conn.sendall(payload)
+
+
+def _recv_frame(conn: socket.socket) -> tuple[bytes, bytes] | None:
+    """Reads one frame; returns None on a clean end of stream."""
+    header = _recv_exact(conn, FRAME_HEADER.size)
+    if header is None:
+        return None
+    kind, size = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise InvoiceParseError(f"Frame of {size} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+    payload = _recv_exact(conn, size)
+    if payload is None:
+        return None
+    return kind, payload
+
+
+def _serve_connection(conn: socket.socket):
+    """Answers render requests on one client connection until it closes."""
+    formats = {kind: fmt for fmt, kind in REQUEST_KINDS.items()}
+    while True:
+        try:
+            frame = _recv_frame(conn)
+        except InvoiceError as e:
+            # The payload was left unread, so the stream is no longer at a
+            # frame boundary: report the error and close the connection.
+            _hang_up(conn, _error_frame(e))
+            return
+        except OSError:
+            return
+        if frame is None:
+            return
+        kind, payload = frame
+        try:
+            if kind not in formats:
+                raise InvoiceParseError(f"Unknown request kind {kind!r}.")
+            reply = b'P', render_invoice(parse_request(payload, formats[kind]))
+        except InvoiceError as e:
+            reply = _error_frame(e)
+        except OSError:
+            return
+        try:
+            _send_frame(conn, *reply)
+        except OSError:
+            return
+
+
+def _error_frame(e: InvoiceError) -> tuple[bytes, bytes]:
+    """The kind and payload of the frame that reports an error to the client."""
+    error = {'type': type(e).__name__, 'message': str(e)}
+    return b'E', json.dumps(error).encode('utf-8')
+
+
+def _hang_up(conn: socket.socket, reply: tuple[bytes, bytes]):
+    """
+    Sends a last reply and ends the connection. Input still on its way is
+    discarded for up to HANG_UP_TIMEOUT seconds: closing with unread data
+    would reset the connection before the client reads the reply.
+    """
+    deadline = time.monotonic() + HANG_UP_TIMEOUT
+    with contextlib.suppress(OSError):
+        _send_frame(conn, *reply)
+        conn.shutdown(socket.SHUT_WR)
+        while (remaining := deadline - time.monotonic()) > 0:
+            conn.settimeout(remaining)
+            if not conn.recv(1024 * 1024):
+                break
+
+
+def _daemon_worker(listener: socket.socket):
+    """Worker process: warms up, then accepts connections off the shared socket."""
+    # Shutdown is driven by the parent, which terminates its workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_up()
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            _serve_connection(conn)
+
+
+def request_render(payload: bytes, fmt: str = 'toml', socket_path: Path | None = None,
+                   timeout: float = 30.0) -> bytes:
+    """
+    Asks a running render daemon to render an invoice document.
 
     Args:
-        data (dict): A dictionary containing all the invoice data.
-        output_path (Path): The file path to save the generated PDF.
+        payload (bytes): The invoice as a TOML or JSON document.
+        fmt (str): Either 'toml' or 'json'.
+        socket_path (Path): The daemon socket; defaults to default_socket_path().
+        timeout (float): Seconds to wait for the daemon.
+
+    Returns:
+        bytes: The rendered PDF.
+
+    Raises:
+        OSError: If the daemon cannot be reached.
+        InvoiceError: The error raised by the daemon while rendering.
     """
+    if fmt not in REQUEST_KINDS:
+        raise InvoiceParseError(f"Unsupported invoice format: {fmt!r}")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(str(socket_path or default_socket_path()))
+        _send_frame(conn, REQUEST_KINDS[fmt], payload)
+        frame = _recv_frame(conn)
+    if frame is None:
+        raise InvoiceRenderError("The render daemon closed the connection without replying.")
+    kind, body = frame
+    if kind == b'E':
+        error = json.loads(body)
+        raise _ERROR_TYPES.get(error['type'], InvoiceError)(error['message'])
+    return body
+
+
+def daemon_main(argv: list[str]):
+    """Keeps pre-warmed render workers resident behind a Unix domain socket."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} daemon",
+        description="Serve invoice rendering requests over a local Unix socket.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "-s", "--socket",
+        type=Path,
+        default=default_socket_path(),
+        help="Path of the Unix socket to listen on (default: %(default)s)."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of resident worker processes (default: number of CPUs)."
+    )
+    args = parser.parse_args(argv)
+
+    socket_path = args.socket
+    if socket_path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(str(socket_path)) == 0:
+                print(f"Error: A daemon is already listening on {socket_path}.", file=sys.stderr)
+                sys.exit(1)
+        socket_path.unlink()  # Left behind by a daemon that did not shut down cleanly.
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    listener.listen(128)
+
+    # Workers are forked so they inherit the listening socket and share its
+    # accept queue; the kernel hands each connection to an idle worker.
+    context = multiprocessing.get_context('fork')
+
+    def spawn_worker():
+        worker = context.Process(target=_daemon_worker, args=(listener,), daemon=True)
+        worker.start()
+        return worker
+
+    workers = [spawn_worker() for _ in range(max(1, args.jobs))]
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"✅ Render daemon listening on {socket_path} with {len(workers)} workers.")
+
     try:
-        # --- Extract data from the dictionary for easier access ---
-        sender = data.get('sender', {})
-        client = data.get('client', {})
-        invoice_info = data.get('invoice', {})
-        items = data.get('items', [])
-        financials = data.get('financials', {})
-        terms = data.get('terms', {})
-
-        # --- Basic Validation ---
-        if not all([sender, client, invoice_info, items]):
-            raise ValueError("Error: TOML file is missing one of the required sections: "
-                             "[sender], [client], [invoice], or [[items]].")
-
-        # --- Initialize Canvas ---
-        c = canvas.Canvas(str(output_path), pagesize=letter)
-        c.setTitle(f"Invoice #{invoice_info.get('number', 'N/A')} from {sender.get('name', 'N/A')}")
-
-        # --- Draw Header ---
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(LEFT_MARGIN, TOP_MARGIN, sender.get('name', 'Sender Name Missing').upper())
-
-        c.setFont("Helvetica-Bold", 24)
-        c.drawRightString(RIGHT_MARGIN, TOP_MARGIN, "INVOICE")
-
-        c.setFont("Helvetica", 10)
-        c.drawRightString(RIGHT_MARGIN, TOP_MARGIN - 0.25 * inch, f"# {invoice_info.get('number', 'N/A')}")
-
-        # --- Draw Client and Date Information ---
-        y_pos = TOP_MARGIN - 1.5 * inch
-
-        # Client Info (Bill To)
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(LEFT_MARGIN, y_pos, "Bill To:")
-        c.setFont("Helvetica", 10)
-        
-        client_name = client.get('name', 'Client Name Missing')
-        client_address = client.get('address', 'Client Address Missing').strip().split('\n')
-        
-        c.drawString(LEFT_MARGIN, y_pos - 0.2 * inch, client_name)
-        
-        text_object = c.beginText(LEFT_MARGIN, y_pos - 0.4 * inch)
-        text_object.setFont("Helvetica", 10)
-        text_object.setLeading(14) # Line spacing
-        for line in client_address:
-            text_object.textLine(line.strip())
-        c.drawText(text_object)
-        
-        # Date, Due Date, Balance Due
-        info_x_pos = RIGHT_MARGIN - 1.5 * inch
-        c.setFont("Helvetica", 10)
-        c.drawString(info_x_pos, y_pos, "Date:")
-        c.drawString(info_x_pos, y_pos - 0.25 * inch, "Due Date:")
-        
-        c.setFont("Helvetica-Bold", 10)
-        c.setFillColor(colors.white)
-        c.rect(info_x_pos - 0.1 * inch, y_pos - 0.55 * inch, 2.6 * inch, 0.3 * inch, fill=1, stroke=0)
-        c.setFillColor(colors.black)
-        c.drawString(info_x_pos, y_pos - 0.5 * inch, "Balance Due:")
-
-        c.setFont("Helvetica", 10)
-        c.drawRightString(RIGHT_MARGIN, y_pos, invoice_info.get('issue_date', 'N/A'))
-        c.drawRightString(RIGHT_MARGIN, y_pos - 0.25 * inch, invoice_info.get('due_date', 'N/A'))
-        
-
-        # --- Calculate Totals ---
-        currency_symbol = invoice_info.get('currency_symbol', '$')
-        tax_rate = Decimal(str(financials.get('tax_rate', 0.0)))
-
-        subtotal = Decimal(0)
-        for item in items:
-            quantity = Decimal(str(item.get('quantity', 0)))
-            rate = Decimal(str(item.get('rate', 0)))
-            subtotal += quantity * rate
-        
-        tax_amount = (subtotal * (tax_rate / Decimal(100))).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        total = subtotal + tax_amount
-
-        c.setFont("Helvetica-Bold", 10)
-        c.drawRightString(RIGHT_MARGIN, y_pos - 0.5 * inch, format_currency(total, currency_symbol))
-
-        # --- Draw Items Table ---
-        y_pos -= 1.5 * inch # Move down for the table
-
-        # ADDED: Get a default stylesheet for paragraphs
-        styles = getSampleStyleSheet()
-        normal_style = styles['Normal']
-        normal_style.fontName = 'Helvetica'
-        normal_style.fontSize = 10
-        
-        table_header = ['Item', 'Quantity', 'Rate', 'Amount']
-        table_data = [table_header]
-        
-        for item in items:
-            quantity = Decimal(str(item.get('quantity', 0)))
-            rate = Decimal(str(item.get('rate', 0)))
-            amount = (quantity * rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-            
-            # MODIFIED: Wrap the description in a Paragraph object for automatic line wrapping
-            description_paragraph = Paragraph(item.get('description', 'N/A'), normal_style)
-            
-            table_data.append([
-                description_paragraph,
-                str(quantity),
-                format_currency(rate, currency_symbol),
-                format_currency(amount, currency_symbol)
-            ])
-
-        table = Table(table_data, colWidths=[CONTENT_WIDTH * 0.55, CONTENT_WIDTH * 0.15, CONTENT_WIDTH * 0.15, CONTENT_WIDTH * 0.15])
-        
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkslategray),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'), # Align numeric columns to the right
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        ])
-        table.setStyle(style)
-
-        table.wrapOn(c, CONTENT_WIDTH, y_pos)
-        table.drawOn(c, LEFT_MARGIN, y_pos - table._height)
-        
-        y_pos -= table._height + 0.5 * inch
-
-        # --- Draw Totals Section ---
-        c.setFont("Helvetica", 10)
-        c.drawRightString(RIGHT_MARGIN - 1 * inch, y_pos, "Subtotal:")
-        c.drawRightString(RIGHT_MARGIN - 1 * inch, y_pos - 0.25 * inch, f"Tax ({tax_rate}%):")
-        c.setFont("Helvetica-Bold", 10)
-        c.drawRightString(RIGHT_MARGIN - 1 * inch, y_pos - 0.5 * inch, "Total:")
-
-        c.setFont("Helvetica", 10)
-        c.drawRightString(RIGHT_MARGIN, y_pos, format_currency(subtotal, currency_symbol))
-        c.drawRightString(RIGHT_MARGIN, y_pos - 0.25 * inch, format_currency(tax_amount, currency_symbol))
-        c.setFont("Helvetica-Bold", 10)
-        c.drawRightString(RIGHT_MARGIN, y_pos - 0.5 * inch, format_currency(total, currency_symbol))
-
-        # --- Draw Terms ---
-        y_pos = BOTTOM_MARGIN + 1 * inch
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(LEFT_MARGIN, y_pos, "Terms:")
-        c.setFont("Helvetica", 10)
-        c.drawString(LEFT_MARGIN, y_pos - 0.2 * inch, terms.get('notes', ''))
-
-        # --- Save PDF ---
-        c.save()
-        print(f"✅ Successfully generated invoice at: {output_path}")
+        while True:
+            multiprocessing.connection.wait([worker.sentinel for worker in workers])
+            for i, worker in enumerate(workers):
+                if not worker.is_alive():
+                    print(f"Worker {worker.pid} exited with code {worker.exitcode}; restarting it.",
+                          file=sys.stderr)
+                    workers[i] = spawn_worker()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        listener.close()
+        socket_path.unlink(missing_ok=True)
+
+
+def client_main(argv: list[str]):
+    """Thin client: sends one invoice file to the render daemon."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} client",
+        description="Render an invoice through a running render daemon.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "invoice_file",
+        type=Path,
+        help="Path to the TOML (or .json) file containing the invoice data."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        help="Path to save the output PDF file, or '-' for stdout.\n"
+             "If not provided, it will be saved in the current directory as:\n"
+             "Invoice-[ClientName]-[Date].pdf"
+    )
+    parser.add_argument(
+        "-s", "--socket",
+        type=Path,
+        default=default_socket_path(),
+        help="Path of the daemon's Unix socket (default: %(default)s)."
+    )
+    args = parser.parse_args(argv)
 
+    fmt = 'json' if args.invoice_file.suffix.lower() == '.json' else 'toml'
+    try:
+        payload = args.invoice_file.read_bytes()
     except FileNotFoundError:
-        print(f"Error: Could not find the input file at the specified path.", file=sys.stderr)
+        print(f"Error: The input file '{args.invoice_file}' was not found.", file=sys.stderr)
         sys.exit(1)
-    except ValueError as ve:
-        print(str(ve), file=sys.stderr)
+    except OSError as e:
+        print(f"Error: Could not read '{args.invoice_file}': {e}", file=sys.stderr)
         sys.exit(1)
-    except Exception as e:
-        print(f"An unexpected error occurred during PDF generation: {e}", file=sys.stderr)
+    try:
+        started = time.perf_counter()
+        pdf = request_render(payload, fmt, args.socket)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except OSError as e:
+        print(f"Error: Could not reach the render daemon at {args.socket}: {e}", file=sys.stderr)
+        sys.exit(1)
+    except InvoiceError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if str(args.output) == '-':
+        sys.stdout.buffer.write(pdf)
+        return
+    output_path = args.output or Path(default_output_name(parse_invoice(payload, fmt)))
+    write_output(output_path, pdf)
+    print(f"✅ Successfully generated invoice at: {output_path} ({elapsed_ms:.1f} ms)")
+
+
+# --- HTTP Service ---
+
+HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 406: 'Not Acceptable',
+    411: 'Length Required', 413: 'Content Too Large', 415: 'Unsupported Media Type',
+    422: 'Unprocessable Content', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+# Request Content-Type (without parameters) -> invoice format.
+HTTP_CONTENT_TYPES = {
+    'application/json': 'json',
+    'application/toml': 'toml',
+    'text/x-toml': 'toml',
+    'text/plain': 'toml',
+}
+
+
+def _requested_output_format(query: str, accept: str) -> str | None:
+    """
+    The output format a render request asks for: ?format=html|text|json|pdf,
+    else the first Accept media type naming one, else PDF. None if ?format
+    names no known format.
+    """
+    requested = urllib.parse.parse_qs(query).get('format')
+    if requested:
+        return requested[-1] if requested[-1] in OUTPUT_FORMATS else None
+    by_media_type = {fmt.content_type.split(';', 1)[0]: name for name, fmt in OUTPUT_FORMATS.items()}
+    for media_type in accept.split(','):
+        name = by_media_type.get(media_type.split(';', 1)[0].strip().lower())
+        if name:
+            return name
+    return 'pdf'
+
+
+class HTTPRequestError(Exception):
+    """A request that cannot be served; the connection is closed after replying."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _render_document(payload: bytes, fmt: str, output_format: str = 'pdf') -> bytes:
+    """Pool task: parses and renders one invoice document."""
+    return render_output(parse_request(payload, fmt), output_format)
+
+
+class RenderService:
+    """
+    Asyncio HTTP front end over a bounded process pool.
+
+    At most max_concurrency renders run at once; up to max_queue further
+    requests wait for a slot, and anything beyond that is rejected with 503
+    straight away so callers can back off instead of piling up.
+    """
+
+    def __init__(self, jobs: int, max_concurrency: int, max_queue: int, max_body: int):
+        self.jobs = jobs
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.executor = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up)
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.jobs,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'served': self.served,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
+
+    async def render(self, payload: bytes, fmt: str, output_format: str = 'pdf') -> bytes:
+        """Runs one render in the pool, waiting for a free slot first."""
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _render_document, payload, fmt, output_format)
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves HTTP/1.1 requests on one connection, honouring keep-alive."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPRequestError as e:
+                    await self._write_response(writer, *_error_response(e.status, str(e)), False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                status, content_type, payload = await self._dispatch(method, target, headers, body)
+                await self._write_response(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target, version = request_line.decode('latin-1').split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+        if 'transfer-encoding' in headers:
+            raise HTTPRequestError(411, "Chunked request bodies are not supported; send Content-Length.")
+        length = int(headers.get('content-length', 0))
+        if length > self.max_body:
+            raise HTTPRequestError(413, f"Request body exceeds {self.max_body} bytes.")
+        body = await reader.readexactly(length)
+        return method, target, headers, body, keep_alive
+
+    async def _dispatch(self, method: str, target: str, headers: dict, body: bytes) -> tuple[int, str, bytes]:
+        path, _, query = target.partition('?')
+        if path in ('/health', '/stats'):
+            if method != 'GET':
+                return _error_response(405, "Use GET.")
+            payload = self.stats() if path == '/stats' else {'status': 'ok'}
+            return 200, 'application/json', json.dumps(payload).encode('utf-8')
+        if path != '/render':
+            return _error_response(404, f"No such endpoint: {path}")
+        if method != 'POST':
+            return _error_response(405, "Use POST.")
+
+        content_type = headers.get('content-type', 'application/toml').split(';', 1)[0].strip().lower()
+        fmt = HTTP_CONTENT_TYPES.get(content_type)
+        if fmt is None:
+            return _error_response(415, f"Unsupported Content-Type: {content_type}")
+        output_format = _requested_output_format(query, headers.get('accept', ''))
+        if output_format is None:
+            return _error_response(406, f"Supported output formats: {', '.join(OUTPUT_FORMATS)}.")
+        if self.slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            return _error_response(503, "Render queue is full, retry later.")
+
+        try:
+            document = await self.render(body, fmt, output_format)
+        except InvoiceParseError as e:
+            self.failed += 1
+            return _error_response(400, str(e))
+        except InvoiceDataError as e:
+            self.failed += 1
+            return _error_response(422, str(e))
+        except Exception as e:
+            self.failed += 1
+            return _error_response(500, str(e))
+        self.served += 1
+        return 200, OUTPUT_FORMATS[output_format].content_type, document
+
+    async def _write_response(self, writer, status, content_type, body, keep_alive):
+        head = [
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+
+
+def _error_response(status: int, message: str) -> tuple[int, str, bytes]:
+    return status, 'application/json', json.dumps({'error': message}).encode('utf-8')
+
+
+def serve_main(argv: list[str]):
+    """Runs the HTTP rendering service."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} serve",
+        description="Serve invoice rendering over HTTP.\n\n"
+                    "  POST /render   TOML or JSON body (by Content-Type), returns application/pdf,\n"
+                    "                 or HTML, text or JSON with ?format= or an Accept header\n"
+                    "  GET  /stats    Concurrency, queue depth and request counters as JSON\n"
+                    "  GET  /health   Liveness check",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: %(default)s).")
+    parser.add_argument("-p", "--port", type=int, default=8080, help="Port to bind (default: %(default)s).")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of render worker processes (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        help="Renders allowed in flight at once (default: same as --jobs)."
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=64,
+        help="Requests allowed to wait for a render slot before\n"
+             "new ones are rejected with 503 (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--max-body",
+        type=int,
+        default=MAX_FRAME_SIZE,
+        help="Largest accepted request body in bytes (default: %(default)s)."
+    )
+    args = parser.parse_args(argv)
+
+    jobs = max(1, args.jobs)
+    service = RenderService(jobs, max(1, args.max_concurrency or jobs), max(0, args.max_queue), args.max_body)
+
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+        # Start and warm every worker now rather than on the first requests.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(service.executor, time.sleep, 0.05) for _ in range(jobs)))
+        print(f"✅ Serving invoices on http://{args.host}:{args.port} with {jobs} workers "
+              f"(concurrency {service.max_concurrency}, queue {service.max_queue}).")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.executor.shutdown(cancel_futures=True)
+
+
+# --- Watch Mode ---
+
+class PollingWatcher:
+    """Detects changed *.toml files by periodically re-scanning the tree."""
+
+    def __init__(self, root: Path, interval: float = 0.5):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in self.root.rglob('*.toml'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        """Blocks up to timeout seconds (forever if None) for changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pause = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if pause > 0:
+                time.sleep(pause)
+            snapshot = self._scan()
+            changed = {path for path, stamp in snapshot.items() if self.snapshot.get(path) != stamp}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detects changed *.toml files through Linux inotify, watching every
+    directory of the tree (new sub-directories are picked up as they appear).
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        try:
+            for directory in [root, *(p for p in root.rglob('*') if p.is_dir())]:
+                self._add_watch(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: Path):
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self.directories[wd] = directory
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        """Blocks up to timeout seconds (forever if None) for changed paths."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        data = os.read(self.fd, 256 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped; fall back to treating every file as changed.
+                changed.update(self.root.rglob('*.toml'))
+                continue
+            if wd not in self.directories:
+                continue
+            path = self.directories[wd] / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_watch(path)
+                    changed.update(path.rglob('*.toml'))
+            elif path.suffix == '.toml' and mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_main(argv: list[str]):
+    """Re-renders invoices as their TOML files change."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} watch",
+        description="Watch a directory and regenerate the PDF of every TOML invoice that changes.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("directory", type=Path, help="Directory tree holding the TOML files.")
+    parser.add_argument(
+        "-d", "--output-dir",
+        type=Path,
+        help="Directory to save the PDFs in, as [input-name].pdf.\n"
+             "If not provided, each PDF is saved next to its TOML file."
+    )
+    parser.add_argument(
+        "--debounce",
+        type=int,
+        default=100,
+        help="Milliseconds of quiet to wait for after a change before\n"
+             "rendering, so bursts of saves render once (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        metavar="SECONDS",
+        help="Poll the tree at this interval instead of using inotify."
+    )
+    args = parser.parse_args(argv)
+
+    root = args.directory.resolve()
+    if not root.is_dir():
+        print(f"Error: '{args.directory}' is not a directory.", file=sys.stderr)
         sys.exit(1)
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    watcher = None
+    if args.poll is None and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(root)
+        except OSError as e:
+            print(f"inotify unavailable ({e}); falling back to polling.", file=sys.stderr)
+    if watcher is None:
+        watcher = PollingWatcher(root, args.poll or 0.5)
+
+    # Content digests of the sources last rendered, so saves that do not
+    # change a file (or touch it) are not re-rendered.
+    digests = {}
+
+    def render_changed(paths):
+        for toml_path in sorted(paths):
+            try:
+                source = toml_path.read_bytes()
+            except OSError:
+                continue  # Removed again before we got to it.
+            digest = hashlib.sha256(source).digest()
+            if digests.get(toml_path) == digest:
+                continue
+            digests[toml_path] = digest
+            for record in split_invoices(io.BytesIO(source), 'toml'):
+                index = None if record.fmt == 'toml' else record.index
+                output_path = batch_output_path(toml_path, args.output_dir, index)
+                started = time.perf_counter()
+                try:
+                    write_output(output_path, render_invoice(parse_invoice_record(record, toml_path.parent)))
+                except (InvoiceError, OSError) as e:
+                    print(f"❌ {toml_path}: {e}", file=sys.stderr)
+                    continue
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(f"✅ {toml_path.relative_to(root)} -> {output_path} ({elapsed_ms:.0f} ms)")
+
+    warm_up()
+    # Bring stale or missing PDFs up to date before watching.
+    stale = []
+    for toml_path in root.rglob('*.toml'):
+        try:
+            modified = toml_path.stat().st_mtime_ns
+            source = toml_path.read_bytes()
+            # A multi-invoice file is current only if every one of its PDFs is.
+            output_paths = [batch_output_path(toml_path, args.output_dir,
+                                              None if record.fmt == 'toml' else record.index)
+                            for record in split_invoices(io.BytesIO(source), 'toml')]
+            if all(path.stat().st_mtime_ns >= modified for path in output_paths):
+                digests[toml_path] = hashlib.sha256(source).digest()
+                continue
+        except OSError:
+            pass
+        stale.append(toml_path)
+    render_changed(stale)
+
+    kind = 'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'
+    print(f"👀 Watching {root} ({kind}); press Ctrl+C to stop.")
+    debounce = args.debounce / 1000
+    try:
+        while True:
+            changed = watcher.wait(None)
+            while more := watcher.wait(debounce):
+                changed |= more
+            render_changed(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+# Sub-commands dispatched on the first argument. Anything else falls through
+# to the classic single-file interface: main.py invoice.toml [-o out.pdf]
+COMMANDS = {
+    'batch': batch_main,
+    'totals': totals_main,
+    'stream': stream_main,
+    'merge': merge_main,
+    'bench': bench_main,
+    'daemon': daemon_main,
+    'client': client_main,
+    'serve': serve_main,
+    'watch': watch_main,
+}
+
 
 def main():
     """Main function to parse arguments and run the generator."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Generate a PDF invoice from a TOML data file.",
+        epilog="Other commands:\n"
+               "  batch    Generate many invoices in parallel (see 'batch --help').\n"
+               "  totals   Report invoice totals as CSV/JSON lines without rendering.\n"
+               "  stream   Render invoices from stdin into a ZIP/tar archive on stdout.\n"
+               "  merge    Render many invoices into one multi-page PDF.\n"
+               "  bench    Compare size and speed of the PDF compression profiles.\n"
+               "  daemon   Keep warm render workers behind a Unix socket.\n"
+               "  client   Render an invoice through a running daemon.\n"
+               "  serve    Serve invoice rendering over HTTP.\n"
+               "  watch    Regenerate invoices as their TOML files change.",
         formatter_class=argparse.RawTextHelpFormatter
     )
     parser.add_argument(
@@ -236,6 +4058,15 @@ def main():
              "If not provided, it will be saved in the current directory as:\n"
              "Invoice-[ClientName]-[Date].pdf"
     )
+    parser.add_argument(
+        "--items",
+        type=Path,
+        help="Stream the line items from this CSV (description, quantity,\n"
+             "rate and optional discount, tax_class columns) or JSON-lines\n"
+             "file instead of [[items]].\n"
+             "Memory use stays flat however many rows it holds."
+    )
+    _add_render_options(parser, subject='the invoice')
     
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
@@ -244,21 +4075,29 @@ def main():
     args = parser.parse_args()
     
     try:
-        data = toml.load(args.toml_file)
+        data = load_invoice(args.toml_file)
     except FileNotFoundError:
         print(f"Error: The input file '{args.toml_file}' was not found.", file=sys.stderr)
         sys.exit(1)
-    except toml.TomlDecodeError as e:
+    except InvoiceParseError as e:
         print(f"Error: Could not parse the TOML file. Please check its syntax.\nDetails: {e}", file=sys.stderr)
         sys.exit(1)
 
     output_path = args.output
     if not output_path:
-        client_name = data.get('client', {}).get('name', 'Client').replace(' ', '_').replace(',', '')
-        issue_date = data.get('invoice', {}).get('issue_date', 'date').replace(' ', '_')
-        output_path = Path(f"Invoice-{client_name}-{issue_date}.pdf")
-        
-    generate_invoice_pdf(data, output_path)
+        output_path = Path(default_output_name(data, OUTPUT_FORMATS[args.output_format].suffix))
+
+    items = None
+    if args.items:
+        if args.output_format != 'pdf':
+            print("Error: --items can only be rendered to PDF.", file=sys.stderr)
+            sys.exit(1)
+        if not args.items.is_file():
+            print(f"Error: The items file '{args.items}' was not found.", file=sys.stderr)
+            sys.exit(1)
+        items = iter_items(args.items)
+
+    generate_invoice_pdf(data, output_path, items, _render_options(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+"""bench skips the invoices it cannot render, as merge does."""
+import json
+from pathlib import Path
+
+import pytest
+import toml
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+
+
+def test_invalid_invoices_are_skipped(tmp_path, capsys):
+    good = toml.loads(SAMPLE.read_text(encoding='utf-8'))
+    bad = {**good, 'items': [{'description': 'x', 'quantity': 1, 'rate': 'x'}]}
+    corpus = tmp_path / 'corpus.jsonl'
+    corpus.write_text('\n'.join(json.dumps(data) for data in (bad, good, bad)) + '\n', encoding='utf-8')
+
+    main.bench_main([str(corpus), '-r', '1'])
+    out, err = capsys.readouterr()
+    assert out.startswith('1 invoice(s), reportlab backend')
+    assert f"{corpus} #1: " in err and f"{corpus} #3: " in err
+    assert '2 invoice(s) skipped.' in err
+
+
+def test_no_valid_invoices(tmp_path, capsys):
+    bad = tmp_path / 'bad.json'
+    bad.write_text(json.dumps({'items': []}), encoding='utf-8')
+    with pytest.raises(SystemExit) as exit_info:
+        main.bench_main([str(bad)])
+    assert exit_info.value.code == 1
+    assert 'No invoices to benchmark' in capsys.readouterr().err
@@ -0,0 +1,67 @@
+"""RenderCache: hits, misses, eviction, and outputs that share an inode with an entry."""
+from pathlib import Path
+
+import pytest
+import toml
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+
+
+@pytest.fixture
+def invoice() -> dict:
+    return toml.loads(SAMPLE.read_text(encoding='utf-8'))
+
+
+def test_hit_and_miss(tmp_path, invoice):
+    cache = main.RenderCache(tmp_path / 'cache', 10 * 1024 * 1024)
+    first, second = tmp_path / 'first.pdf', tmp_path / 'second.pdf'
+
+    assert cache.render_to(invoice, first) is False
+    assert cache.render_to(invoice, second) is True
+    assert second.read_bytes() == first.read_bytes()
+    assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0}
+
+
+def test_key_ignores_what_the_renderer_does_not_read(invoice):
+    key = main.RenderCache.key(invoice)
+    assert main.RenderCache.key({**invoice, 'notes': {'internal': True}}) == key
+    assert main.RenderCache.key({**invoice, 'invoice': {**invoice['invoice'], 'number': 99}}) != key
+    assert main.RenderCache.key(invoice, main.RenderOptions('html').cache_variant) != key
+
+
+def test_prune_keeps_the_store_bounded(tmp_path, invoice):
+    cache = main.RenderCache(tmp_path / 'cache', 1)
+    cache.render_to(invoice, tmp_path / 'out.pdf')
+    assert cache.size == 0
+    assert cache.stats['evictions'] == 1
+
+
+def test_miss_does_not_overwrite_a_linked_entry(tmp_path, invoice):
+    """batch, batch (hit), change the invoice, batch, revert it, batch (hit)."""
+    source, output_dir = tmp_path / 'a.toml', tmp_path / 'out'
+    output = output_dir / 'a.pdf'
+    argv = [str(source), '-d', str(output_dir), '-j', '1', '--cache-dir', str(tmp_path / 'cache')]
+
+    def batch(data: dict) -> bytes:
+        source.write_text(toml.dumps(data), encoding='utf-8')
+        main.batch_main(argv)
+        return output.read_bytes()
+
+    original = batch(invoice)
+    assert batch(invoice) == original
+    changed = batch({**invoice, 'invoice': {**invoice['invoice'], 'number': 99}})
+    assert changed != original
+    assert batch(invoice) == original
+
+
+def test_replacing_file_leaves_no_partial_output(tmp_path):
+    path = tmp_path / 'out.pdf'
+    path.write_bytes(b'old')
+    with pytest.raises(RuntimeError):
+        with main.replacing_file(path) as stream:
+            stream.write(b'new')
+            raise RuntimeError
+    assert path.read_bytes() == b'old'
+    assert [entry.name for entry in tmp_path.iterdir()] == ['out.pdf']
@@ -0,0 +1,66 @@
+"""currency_format: minor units, grouping, separators and symbol placement per locale."""
+from decimal import Decimal
+
+import pytest
+
+import main
+
+NBSP = '\u00a0'
+
+
+@pytest.mark.parametrize('code, locale, expected', [
+    ('USD', 'en_US', '$-1,234,567.50'),
+    (None, 'en_US', '$-1,234,567.50'),
+    ('JPY', 'ja_JP', '¥-1,234,568'),
+    ('KWD', 'en_US', f"KWD{NBSP}-1,234,567.500"),
+    ('EUR', 'de_DE', f"-1.234.567,50{NBSP}€"),
+    ('EUR', 'fr_FR', f"-1{NBSP}234{NBSP}567,50{NBSP}€"),
+    ('CHF', 'de_CH', f"CHF{NBSP}-1'234'567.50"),
+    ('INR', 'en_IN', '₹-12,34,567.50'),
+    ('BRL', 'pt_BR', f"R${NBSP}-1.234.567,50"),
+])
+def test_locale_rules(code, locale, expected):
+    assert main.currency_format(code, locale).format(Decimal('-1234567.5')) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('0', '₹0.00'), ('999', '₹999.00'), ('1000', '₹1,000.00'), ('100000', '₹1,00,000.00'),
+    ('12345678901', '₹12,34,56,78,901.00'),
+])
+def test_indian_grouping(value, expected):
+    assert main.currency_format('INR', 'en_IN').format(Decimal(value)) == expected
+
+
+def test_minor_units_set_the_quantum():
+    assert main.currency_format('JPY').quantum == Decimal(1)
+    assert main.currency_format('KWD').quantum == Decimal('0.001')
+    assert main.currency_format('XYZ').quantum == Decimal('0.01')
+    assert main.currency_format('JPY').quantum == main.currency_quantum('JPY')
+
+
+def test_symbols():
+    assert main.currency_format('EUR', 'de-DE', symbol='EUR').format(Decimal(5)) == f"5,00{NBSP}EUR"
+    assert main.currency_format('XYZ').format(Decimal(5)) == f"XYZ{NBSP}5.00"
+    assert main.format_currency(Decimal('1234.5'), '£') == '£1,234.50'
+
+
+def test_formatters_are_compiled_once():
+    assert main.currency_format('EUR', 'de_DE') is main.currency_format('EUR', 'de_DE')
+
+
+def test_memo_keeps_negative_zero_apart():
+    formatter = main.currency_format('USD', 'en_US').format
+    assert formatter(Decimal('0')) == '$0.00'
+    assert formatter(Decimal('-0')) == '$-0.00'
+    assert formatter(Decimal('5')) == formatter(Decimal('5.00')) == '$5.00'
+
+
+def test_invoice_settings():
+    data = {'invoice': {'currency': ' eur ', 'locale': 'fr_FR', 'currency_symbol': 'EUR'}}
+    currency = main.invoice_currency_format(data)
+    assert (currency.code, currency.symbol) == ('EUR', 'EUR')
+    assert currency.format(Decimal('1234.5')) == f"1{NBSP}234,50{NBSP}EUR"
+    with pytest.raises(main.InvoiceDataError, match='Unknown locale'):
+        main.invoice_currency_format({'invoice': {'locale': 'xx_XX'}})
+    with pytest.raises(main.InvoiceDataError, match='ISO 4217'):
+        main.invoice_currency_format({'invoice': {'currency': 'euro'}})
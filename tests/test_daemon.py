@@ -0,0 +1,106 @@
+"""The render daemon's framing, and the client that talks to it."""
+import json
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+import toml
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+
+
+@pytest.fixture
+def connection():
+    """A client socket with _serve_connection answering on the other end."""
+    client, server = socket.socketpair()
+
+    def serve():
+        with server:
+            main._serve_connection(server)
+
+    worker = threading.Thread(target=serve)
+    worker.start()
+    yield client
+    client.close()
+    worker.join(10)
+    assert not worker.is_alive()
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """The path of a Unix socket served by one in-process daemon worker."""
+    path = tmp_path / 'd.sock'
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen()
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with conn:
+                main._serve_connection(conn)
+
+    worker = threading.Thread(target=serve)
+    worker.start()
+    yield path
+    listener.shutdown(socket.SHUT_RDWR)  # wakes the blocked accept()
+    worker.join(10)
+    listener.close()
+
+
+def test_one_connection_serves_many_requests(connection):
+    invoice = toml.loads(SAMPLE.read_text(encoding='utf-8'))
+    requests = [(b't', SAMPLE.read_bytes()), (b'j', json.dumps(invoice, default=str).encode()),
+                (b'x', b'{}'), (b't', b'[invoice')]
+    replies = []
+    for kind, payload in requests:
+        main._send_frame(connection, kind, payload)
+        replies.append(main._recv_frame(connection))
+
+    assert [kind for kind, _ in replies] == [b'P', b'P', b'E', b'E']
+    assert all(body.startswith(b'%PDF-') for _, body in replies[:2])
+    assert [json.loads(body)['type'] for _, body in replies[2:]] == ['InvoiceParseError'] * 2
+    connection.shutdown(socket.SHUT_WR)
+    assert main._recv_frame(connection) is None
+
+
+def test_oversized_frame_is_refused_and_the_connection_closed(connection, monkeypatch):
+    monkeypatch.setattr(main, 'HANG_UP_TIMEOUT', 1.0)
+    connection.sendall(main.FRAME_HEADER.pack(b't', main.MAX_FRAME_SIZE + 1))
+    connection.sendall(b'x' * 100_000)  # the start of the payload the daemon will not read
+
+    kind, body = main._recv_frame(connection)
+    assert kind == b'E'
+    assert 'exceeds' in json.loads(body)['message']
+    assert main._recv_frame(connection) is None
+
+
+def test_truncated_frame_ends_the_connection(connection):
+    connection.sendall(main.FRAME_HEADER.pack(b't', 100) + b'[invoice]')
+    connection.shutdown(socket.SHUT_WR)
+    assert main._recv_frame(connection) is None
+
+
+def test_request_render(daemon):
+    assert main.request_render(SAMPLE.read_bytes(), 'toml', daemon).startswith(b'%PDF-')
+    with pytest.raises(main.InvoiceDataError):
+        main.request_render(b'[invoice]\nnumber = 1\n', 'toml', daemon)
+    with pytest.raises(main.InvoiceParseError):
+        main.request_render(b'{}', 'yaml', daemon)
+
+
+def test_client_command(daemon, tmp_path, capsys):
+    output = tmp_path / 'out.pdf'
+    main.client_main([str(SAMPLE), '-o', str(output), '-s', str(daemon)])
+    assert output.read_bytes().startswith(b'%PDF-')
+    assert 'Successfully generated' in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        main.client_main([str(SAMPLE), '-s', str(tmp_path / 'missing.sock')])
+    assert 'Could not reach the render daemon' in capsys.readouterr().err
@@ -0,0 +1,45 @@
+"""Where [fonts] paths are looked up, and who may give them."""
+import json
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+
+
+def test_relative_paths_follow_the_invoice_file(tmp_path, monkeypatch):
+    (tmp_path / 'invoices').mkdir()
+    source = tmp_path / 'invoices' / 'a.toml'
+    source.write_text(SAMPLE.read_text(encoding='utf-8') + '\n[fonts]\nregular = "fonts/r.ttf"\n',
+                      encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    expected = str((tmp_path / 'invoices' / 'fonts' / 'r.ttf').resolve())
+    assert main.font_paths(main.load_invoice(Path('invoices/a.toml'))) == (expected, expected)
+    assert [main.font_paths(data) for data in main.iter_invoices(source)] == [(expected, expected)]
+
+
+@pytest.mark.parametrize('fmt, payload', [
+    ('toml', b'[fonts]\nregular = "/etc/passwd"\n'),
+    ('json', json.dumps({'fonts': {'regular': '/dev/zero'}}).encode()),
+])
+def test_requests_may_not_name_fonts(fmt, payload):
+    with pytest.raises(main.InvoiceDataError, match='INVOICE_FONTS'):
+        main.parse_request(payload, fmt)
+
+
+def test_daemon_refuses_fonts_without_opening_them():
+    client, server = socket.socketpair()
+    worker = threading.Thread(target=main._serve_connection, args=(server,))
+    worker.start()
+    with client:
+        main._send_frame(client, b't', SAMPLE.read_bytes() + b'\n[fonts]\nregular = "/etc/passwd"\n')
+        kind, body = main._recv_frame(client)
+    worker.join(5)
+    server.close()
+    assert kind == b'E'
+    assert json.loads(body)['type'] == 'InvoiceDataError'
+    assert '/etc/passwd' not in body.decode()
@@ -0,0 +1,42 @@
+"""Multi-invoice TOML files: shared tables and [[invoices]] entries."""
+import io
+
+import pytest
+
+import main
+
+SHARED = b'[sender]\nname = "S"\n\n'
+ENTRY = b'[[invoices]]\nclient = { name = "%s" }\ninvoice = { number = 1 }\nitems = [{ quantity = 1, rate = 2 }]\n'
+
+
+def _parse(source: bytes) -> list:
+    results = []
+    for record in main.split_invoices(io.BytesIO(source), 'toml'):
+        try:
+            results.append(main.parse_invoice_record(record))
+        except main.InvoiceError as e:
+            results.append(e)
+    return results
+
+
+def test_tables_before_the_first_entry_are_shared():
+    first, second = _parse(SHARED + ENTRY % b'A' + b'[invoices.financials]\ntax_rate = 5\n' + ENTRY % b'B')
+    assert (first['sender'], first['client'], first['financials']) == ({'name': 'S'}, {'name': 'A'}, {'tax_rate': 5})
+    assert (second['sender'], second['client']) == ({'name': 'S'}, {'name': 'B'})
+    assert 'financials' not in second
+
+
+def test_top_level_table_after_an_entry_is_refused():
+    first, second = _parse(SHARED + ENTRY % b'A' + b'[financials]\ntax_rate = 5\n' + ENTRY % b'B')
+    assert isinstance(first, main.InvoiceDataError)
+    assert '[financials]' in str(first) and '[invoices.financials]' in str(first)
+    assert second['client'] == {'name': 'B'}
+
+
+def test_merge_skips_the_refused_entry(tmp_path, capsys):
+    source = tmp_path / 'many.toml'
+    source.write_bytes(SHARED + ENTRY % b'A' + b'[[items]]\nquantity = 1\nrate = 1\n' + ENTRY % b'B')
+    with pytest.raises(SystemExit):
+        main.merge_main([str(source), '-o', str(tmp_path / 'all.pdf')])
+    assert f"{source} #1: Invoice #1 is followed by top-level [items]" in capsys.readouterr().err
+    assert (tmp_path / 'all.pdf').read_bytes().startswith(b'%PDF-')
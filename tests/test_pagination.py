@@ -0,0 +1,60 @@
+"""Invariants of _paginate_rows: every row once, in order, and room for the totals."""
+import random
+
+import pytest
+
+import main
+
+FIRST_CAPACITY = main.FIRST_PAGE_TABLE_TOP - main.BOTTOM_MARGIN - main.TABLE_HEADER_HEIGHT
+CONTINUED_CAPACITY = main.CONTINUED_TABLE_TOP - main.BOTTOM_MARGIN - main.TABLE_HEADER_HEIGHT
+
+
+def _rules(tax_count: int) -> main.PricingRules:
+    return main.pricing_rules({'taxes': [{'name': f"Tax {n}", 'rate': 1} for n in range(tax_count)]})
+
+
+def _check_pages(heights: list[float], floor: float):
+    pages = list(main._paginate_rows(enumerate(heights), floor))
+
+    assert [row for page in pages for row in page] == list(range(len(heights)))
+    assert pages
+    for number, page in enumerate(pages):
+        capacity = FIRST_CAPACITY if number == 0 else CONTINUED_CAPACITY
+        # Only a row taller than a whole page may overfill one, on its own.
+        assert sum(heights[row] for row in page) <= capacity or len(page) == 1
+        # Only the last page may be empty, holding just the totals (or, with
+        # no rows at all, the first too).
+        assert page or number == len(pages) - 1 or not heights
+
+    last = pages[-1]
+    top = main.FIRST_PAGE_TABLE_TOP if len(pages) == 1 else main.CONTINUED_TABLE_TOP
+    table_bottom = top - main.TABLE_HEADER_HEIGHT - sum(heights[row] for row in last) if last else top
+    assert table_bottom >= floor - 1e-6
+    return pages
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_rows(seed):
+    rnd = random.Random(seed)
+    heights = [rnd.choice([main.TABLE_LEADING + main.TABLE_ROW_PADDING,
+                           rnd.uniform(20, 120), rnd.uniform(120, 500)])
+               for _ in range(rnd.randint(0, 60))]
+    _check_pages(heights, main._totals_floor(_rules(rnd.randint(0, 30))))
+
+
+def test_no_row_fits_above_the_floor():
+    """The totals move to a page of their own instead of overlapping the terms."""
+    short = main.TABLE_LEADING + main.TABLE_ROW_PADDING
+    assert _check_pages([FIRST_CAPACITY - short], main.LAST_PAGE_TABLE_FLOOR) == [[0], []]
+    heights = [short] * 40 + [CONTINUED_CAPACITY - short]
+    assert _check_pages(heights, main.LAST_PAGE_TABLE_FLOOR)[-2:] == [[40], []]
+
+
+@pytest.mark.parametrize('tax_count', [1, 14, 16, 26, 40])
+def test_totals_floor_fits_a_page(tax_count):
+    """However many taxes, the totals fit below the top of a continuation page."""
+    floor = main._totals_floor(_rules(tax_count))
+    assert main.LAST_PAGE_TABLE_FLOOR <= floor <= main.CONTINUED_TABLE_TOP
+    pages = _check_pages([main.TABLE_LEADING + main.TABLE_ROW_PADDING] * 3, floor)
+    if floor > main.FIRST_PAGE_TABLE_TOP:
+        assert pages[-1] == []
@@ -0,0 +1,126 @@
+"""The HTTP service: routing, status codes, keep-alive and the queue limit."""
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+
+
+async def _exchange(reader, writer, method: str, target: str, body: bytes = b'', **headers: str):
+    """Sends one request and returns (status, headers, body) of the reply."""
+    lines = [f"{method} {target} HTTP/1.1", 'Host: test', f"Content-Length: {len(body)}"]
+    lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    status = int((await reader.readline()).split()[1])
+    reply_headers = {}
+    while (line := await reader.readline()) != b'\r\n':
+        name, _, value = line.decode('latin-1').partition(':')
+        reply_headers[name.lower()] = value.strip()
+    return status, reply_headers, await reader.readexactly(int(reply_headers['content-length']))
+
+
+def _with_service(test, **limits):
+    """Runs test(service, connect) against a RenderService on a local port."""
+    service = main.RenderService(1, limits.get('max_concurrency', 1), limits.get('max_queue', 4),
+                                 limits.get('max_body', 1024 * 1024))
+
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        # Start the worker first, as serve_main does: forked later, it would
+        # inherit the connections' sockets and keep them open.
+        await asyncio.get_running_loop().run_in_executor(service.executor, time.sleep, 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            await test(service, lambda: asyncio.open_connection('127.0.0.1', port))
+
+    try:
+        asyncio.run(asyncio.wait_for(run(), 60))
+    finally:
+        service.executor.shutdown()
+
+
+def test_render_formats_and_keep_alive():
+    async def test(service, connect):
+        reader, writer = await connect()
+        status, headers, body = await _exchange(reader, writer, 'POST', '/render', SAMPLE.read_bytes())
+        assert (status, headers['content-type']) == (200, 'application/pdf')
+        assert body.startswith(b'%PDF-')
+        assert headers['connection'] == 'keep-alive'
+
+        status, _, body = await _exchange(reader, writer, 'POST', '/render?format=json', SAMPLE.read_bytes(),
+                                          Content_Type='text/x-toml')
+        assert status == 200
+        assert json.loads(body)['total'] == '5000.00'
+
+        invoice = json.dumps({'sender': {'name': 'S'}, 'client': {'name': 'C'}, 'invoice': {'number': 1},
+                              'items': [{'description': 'x', 'quantity': 2, 'rate': 3}]}).encode()
+        status, headers, body = await _exchange(reader, writer, 'POST', '/render', invoice,
+                                                Content_Type='application/json', Accept='text/html')
+        assert (status, headers['content-type'].split(';')[0]) == (200, 'text/html')
+        assert b'$6.00' in body
+
+        status, _, body = await _exchange(reader, writer, 'GET', '/stats')
+        assert json.loads(body) | {'workers': 1} == {
+            'workers': 1, 'max_concurrency': 1, 'max_queue': 4, 'in_flight': 0, 'queued': 0,
+            'served': 3, 'failed': 0, 'rejected': 0}
+        writer.close()
+
+    _with_service(test)
+
+
+@pytest.mark.parametrize('method, target, body, headers, expected', [
+    ('POST', '/render', b'[invoice', {}, 400),
+    ('POST', '/render', b'[invoice]\nnumber = 1\n', {}, 422),
+    ('POST', '/render', b'[fonts]\nregular = "/etc/passwd"\n', {}, 422),
+    ('POST', '/render', b'', {'Content_Type': 'image/png'}, 415),
+    ('POST', '/render?format=docx', b'', {}, 406),
+    ('GET', '/render', b'', {}, 405),
+    ('POST', '/health', b'', {}, 405),
+    ('GET', '/nowhere', b'', {}, 404),
+])
+def test_errors(method, target, body, headers, expected):
+    async def test(service, connect):
+        reader, writer = await connect()
+        status, reply_headers, reply = await _exchange(reader, writer, method, target, body, **headers)
+        assert status == expected
+        assert reply_headers['content-type'] == 'application/json'
+        assert json.loads(reply)['error']
+        # The request was read in full, so the connection can carry on.
+        assert (await _exchange(reader, writer, 'GET', '/health'))[0] == 200
+        writer.close()
+
+    _with_service(test)
+
+
+def test_unreadable_bodies_close_the_connection():
+    async def test(service, connect):
+        reader, writer = await connect()
+        status, headers, _ = await _exchange(reader, writer, 'POST', '/render', b'x' * 2048)
+        assert (status, headers['connection']) == (413, 'close')
+        assert await reader.read() == b''
+
+        reader, writer = await connect()
+        status, _, _ = await _exchange(reader, writer, 'POST', '/render', Transfer_Encoding='chunked')
+        assert status == 411
+        assert await reader.read() == b''
+
+    _with_service(test, max_body=1024)
+
+
+def test_full_queue_is_rejected():
+    async def test(service, connect):
+        await service.slots.acquire()  # the one render slot is busy
+        reader, writer = await connect()
+        status, headers, _ = await _exchange(reader, writer, 'POST', '/render', SAMPLE.read_bytes())
+        assert (status, headers['retry-after']) == (503, '1')
+        assert service.stats()['rejected'] == 1
+        service.slots.release()
+        assert (await _exchange(reader, writer, 'POST', '/render', SAMPLE.read_bytes()))[0] == 200
+        writer.close()
+
+    _with_service(test, max_queue=0)
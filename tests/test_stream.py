@@ -0,0 +1,77 @@
+"""stream: invoices on stdin become archive members on a non-seekable stdout."""
+import io
+import json
+import subprocess
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+import toml
+
+import main
+
+ROOT = Path(__file__).parent.parent
+SAMPLE = ROOT / 'sample-invoice.toml'
+
+
+class _Pipe(io.RawIOBase):
+    """A write-only stream that cannot seek or tell, like stdout into a pipe."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+
+def _stream(stdin: bytes, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, str(ROOT / 'main.py'), 'stream', '-j', '2', *args],
+                          input=stdin, capture_output=True, timeout=120)
+
+
+@pytest.mark.parametrize('fmt', ['zip', 'tar', 'tgz'])
+def test_archive_writer_needs_no_seeking(fmt):
+    pipe = _Pipe()
+    archive = main.ArchiveWriter(pipe, fmt)
+    archive.add('a.pdf', b'%PDF-a')
+    archive.add('b.pdf', b'%PDF-b' * 1000)
+    archive.close()
+    data = io.BytesIO(b''.join(pipe.chunks))
+    if fmt == 'zip':
+        with zipfile.ZipFile(data) as result:
+            assert [(name, result.read(name)[:6]) for name in result.namelist()] == [
+                ('a.pdf', b'%PDF-a'), ('b.pdf', b'%PDF-b')]
+    else:
+        with tarfile.open(fileobj=data) as result:
+            assert [(member.name, member.size) for member in result] == [('a.pdf', 6), ('b.pdf', 6000)]
+
+
+def test_records_are_archived_in_order_and_failures_reported():
+    invoice = toml.loads(SAMPLE.read_text(encoding='utf-8'))
+    records = [{**invoice, 'invoice': {**invoice['invoice'], 'number': n}} for n in range(5)]
+    records[2] = {**invoice, 'items': [{'description': 'x', 'quantity': 1, 'rate': 'x'}]}
+    stdin = ''.join(json.dumps(record, default=str) + '\n' for record in records).encode()
+
+    result = _stream(stdin)
+    assert result.returncode == 1
+    with zipfile.ZipFile(io.BytesIO(result.stdout)) as archive:
+        names = archive.namelist()
+        assert all(archive.read(name).startswith(b'%PDF-') for name in names)
+    assert [name[:7] for name in names] == ['000001-', '000002-', '000004-', '000005-']
+    assert b'invoice #3:' in result.stderr
+    assert b'Streamed 4 of 5 invoices' in result.stderr
+
+
+def test_toml_input_and_other_output_formats():
+    result = _stream(SAMPLE.read_bytes(), '--input-format', 'toml', '--format', 'tar', '--output-format', 'json')
+    assert result.returncode == 0, result.stderr
+    with tarfile.open(fileobj=io.BytesIO(result.stdout)) as archive:
+        [member] = archive.getmembers()
+        assert member.name.startswith('000001-') and member.name.endswith('.json')
+        assert json.load(archive.extractfile(member))['total'] == '5000.00'
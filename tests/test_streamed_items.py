@@ -0,0 +1,44 @@
+"""render_invoice_stream writes each page out while the items are still being read."""
+import io
+import re
+from pathlib import Path
+
+import toml
+
+import main
+
+SAMPLE = Path(__file__).parent.parent / 'sample-invoice.toml'
+XREF_ENTRY = re.compile(rb'^(\d{10}) 00000 n ', re.MULTILINE)
+
+
+def _items(count: int, output: io.BytesIO | None = None, written: list | None = None):
+    for n in range(count):
+        if written is not None:
+            written.append(output.tell())
+        yield {'description': f"Usage {n}", 'quantity': 1 + n % 7, 'rate': 1.25}
+
+
+def test_pages_are_written_as_they_are_finished(monkeypatch):
+    monkeypatch.setattr(main.rl_config, 'invariant', 1)  # so the two renders match
+    data = toml.loads(SAMPLE.read_text(encoding='utf-8'))
+    output, written = io.BytesIO(), []
+    assert main.render_invoice_stream(data, _items(600, output, written), output=output) is None
+    pdf = output.getvalue()
+
+    # The output grows page by page while the items are read, and only the
+    # objects shared by all pages are left for the end.
+    assert written[0] < 1000
+    assert len(set(written)) >= pdf.count(b'/Type /Page\n') - 1
+    assert written[-1] > len(pdf) / 2
+    assert main.render_invoice_stream(data, _items(600)) == pdf
+
+
+def test_cross_reference_table_points_at_every_object():
+    data = toml.loads(SAMPLE.read_text(encoding='utf-8'))
+    pdf = main.render_invoice_stream(data, _items(100), 'fast')
+    start = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', pdf)[1])
+    assert pdf[start:].startswith(b'xref\n0 ')
+    offsets = [int(offset) for offset in XREF_ENTRY.findall(pdf[start:])]
+    for number, offset in enumerate(offsets, start=1):
+        assert pdf[offset:].startswith(f"{number} 0 obj\n".encode()), number
+    assert b'(Usage 99)' in pdf
@@ -0,0 +1,65 @@
+"""Pre-wrapped description cells must put every word where Paragraph would."""
+import io
+import random
+import re
+
+import pytest
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+
+import main
+
+WORDS = ('hosting', 'Dev', 'Über', 'standard', 'café', 'x', 'support', 'WWWW', 'iiii', 'migration',
+         'Q3', 'on-call', '—', 'licence', 'ÆØÅ')
+# One text-showing operator with the word spacing set before it, if any.
+SHOW_TEXT = re.compile(r'(?:(-?[\d.]+) Tw )?\(((?:[^\\)]|\\.)*)\) Tj')
+
+
+def _shown(ops: list[str]) -> list[tuple[float, str]]:
+    """(word spacing, text) of every line drawn, in order."""
+    shown, spacing = [], 0.0
+    for op in ops:
+        for given, text in SHOW_TEXT.findall(op):
+            spacing = float(given) if given else spacing
+            shown.append((spacing, text))
+    return shown
+
+
+def _paragraph(context: main.RenderContext, text: str) -> list[tuple[float, str]]:
+    c = canvas.Canvas(io.BytesIO(), pageCompression=0)
+    paragraph = Paragraph(text, context.description_style)
+    paragraph.wrap(context.description_width, main.PAGE_HEIGHT)
+    paragraph.drawOn(c, 0, 0)
+    return _shown(c._code)
+
+
+def _string_cell(context: main.RenderContext, lines: tuple[str, ...]) -> list[tuple[float, str]]:
+    c = canvas.Canvas(io.BytesIO(), pageCompression=0)
+    table = main._items_table(context, [['\n'.join(lines), '', '', '']])
+    table.wrapOn(c, main.CONTENT_WIDTH, main.PAGE_HEIGHT)
+    table.drawOn(c, 0, 0)
+    header = len(context.table_header)
+    return _shown(c._code)[header:]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_wrapped_lines_draw_like_paragraph(seed):
+    context = main.render_context()
+    rnd = random.Random(seed)
+    drawn = 0
+    for _ in range(500):
+        text = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 40)))
+        lines = context.description_lines(text)
+        if lines is None:
+            continue
+        drawn += 1
+        assert _string_cell(context, lines) == _paragraph(context, text), text
+    assert drawn > 250  # The fast path still takes most descriptions.
+
+
+def test_overfull_line_is_left_to_paragraph():
+    """Paragraph squeezes this first line into the column by shrinking its spaces."""
+    context = main.render_context()
+    text = 'hosting Dev Über standard hosting standard café Dev standard x Über hosting'
+    assert any(spacing < 0 for spacing, _ in _paragraph(context, text))
+    assert context.description_lines(text) is None
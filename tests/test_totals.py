@@ -0,0 +1,134 @@
+"""batch_totals must give exactly the figures the renderer computes with Decimal."""
+import random
+
+import pytest
+
+import main
+
+NUMBERS = (0, 1, -3, 250, 0.1, 0.7, 0.005, 0.015, -0.005, 0.125, 2.5, -2.5, 1e-7, '1e3', '.5',
+           ' 3.25 ', '1.', -0.0, 10**19, 1e20)
+
+
+def _number(rnd: random.Random):
+    choice = rnd.random()
+    if choice < 0.2:
+        return rnd.randint(-5, 500)
+    if choice < 0.5:
+        return round(rnd.uniform(-100, 1000), rnd.randint(0, 4))
+    if choice < 0.6:
+        return str(round(rnd.uniform(-50, 50), rnd.randint(0, 6)))
+    if choice < 0.7:
+        return rnd.choice(NUMBERS)
+    if choice < 0.75:
+        return rnd.randint(10**12, 10**17)
+    return round(rnd.uniform(0, 100), 2)
+
+
+def _financials(rnd: random.Random) -> dict:
+    choice = rnd.random()
+    if choice < 0.1:
+        return {}
+    if choice < 0.5:
+        return {'tax_rate': rnd.choice([0, 7.5, 8.875, 20, -5, 13.333, '19', 1e-9])}
+    return {'taxes': [{'name': f"Tax {n}", 'rate': rnd.choice([5, 9.975, 7, 0, -2, 12.5]),
+                       'compound': rnd.random() < 0.4,
+                       **({'class_rates': {'food': rnd.choice([0, 2.5, 5]), 'zero': 0}}
+                          if rnd.random() < 0.5 else {})}
+                      for n in range(rnd.randint(0, 3))]}
+
+
+def _item(rnd: random.Random) -> dict:
+    item = {'quantity': _number(rnd), 'rate': _number(rnd)}
+    if rnd.random() < 0.3:
+        item['discount'] = rnd.choice([10, 12.5, 100, 0, 33.333, -5, '7.5', 150, 0.001])
+    if rnd.random() < 0.4:
+        item['tax_class'] = rnd.choice(['food', 'zero', 'other', main.DEFAULT_TAX_CLASS])
+    return item
+
+
+def _invoices(count: int, seed: int = 7) -> list[tuple[str, dict]]:
+    rnd = random.Random(seed)
+    invoices = []
+    for n in range(count):
+        invoice = {'number': n}
+        if rnd.random() < 0.4:
+            invoice['currency'] = rnd.choice(['JPY', 'KWD', 'EUR', 'USD'])
+        items = [_item(rnd) for _ in range(rnd.randint(1, 12))]
+        invoices.append((str(n), {'sender': {'name': 'Sender'}, 'client': {'name': 'Client'},
+                                  'invoice': invoice, 'items': items, 'financials': _financials(rnd)}))
+    return invoices
+
+
+def _reference(data: dict) -> main.Totals:
+    currency = main.invoice_currency_format(data)
+    lines = list(main.invoice_lines(data['items'], currency))
+    return main.invoice_totals(lines, data['financials'], currency.quantum)
+
+
+def _exact(totals: main.Totals) -> tuple:
+    """
+    The figures to compare: the rounded ones as strings, so 5.0 and 5.00
+    differ; the subtotal and total are left unrounded, and only their value
+    counts (they are rounded when printed).
+    """
+    return (str(totals.tax_rate), totals.subtotal, str(totals.tax_amount), totals.total,
+            [(label, str(amount)) for label, amount in totals.taxes])
+
+
+@pytest.fixture(params=['numpy', 'decimal'])
+def engine(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(main, 'np', None)
+    return request.param
+
+
+def test_batch_totals_match_decimal(engine):
+    invoices = _invoices(2000)
+    computed, skipped = main.batch_totals(invoices)
+    data = dict(invoices)
+    assert len(computed) + len(skipped) == len(invoices)
+    assert [label for label, _ in computed] == [label for label, _ in invoices
+                                                if label not in dict(skipped)]
+    for label, totals in computed:
+        try:
+            reference = _reference(data[label])
+        except ArithmeticError:
+            continue  # Line amounts beyond Decimal's precision cannot be rendered.
+        assert _exact(totals) == _exact(reference), label
+    for label, _ in skipped:
+        with pytest.raises((main.InvoiceDataError, ArithmeticError)):
+            _reference(data[label])
+
+
+def test_fixed_point_engine_takes_ordinary_invoices():
+    """The comparison above only means something if NumPy does the work."""
+    pytest.importorskip('numpy')
+    rnd = random.Random(11)
+    invoices = [{'sender': {'name': 'Sender'}, 'client': {'name': 'Client'}, 'invoice': {'number': n},
+                 'items': [{'quantity': rnd.randint(1, 40), 'rate': round(rnd.uniform(0, 500), 2)}
+                           for _ in range(rnd.randint(1, 8))],
+                 'financials': rnd.choice([{}, {'tax_rate': 8.875}, {'taxes': [
+                     {'name': 'GST', 'rate': 5}, {'name': 'QST', 'rate': 9.975, 'compound': True}]}])}
+                for n in range(200)]
+    items = [item for data in invoices for item in data['items']]
+    fixed = main._fixed_point_totals([main.pricing_rules(data['financials']) for data in invoices],
+                                     [main.DEFAULT_MINOR_UNITS] * len(invoices),
+                                     [len(data['items']) for data in invoices],
+                                     [item['quantity'] for item in items], [item['rate'] for item in items],
+                                     [None] * len(items), [None] * len(items))
+    assert None not in fixed
+    assert [_exact(totals) for totals in fixed] == [_exact(_reference(data)) for data in invoices]
+
+
+def test_batch_totals_reports_invalid_invoices():
+    sections = {'sender': {'name': 'Sender'}, 'client': {'name': 'Client'}, 'invoice': {'number': 1}}
+    computed, skipped = main.batch_totals([
+        ('good', {**sections, 'items': [{'quantity': 2, 'rate': 1.5}]}),
+        ('bad rate', {**sections, 'items': [{'quantity': 1, 'rate': 'x'}]}),
+        ('no items', sections),
+        ('bad client', {**sections, 'client': 'Client', 'items': [{'quantity': 1, 'rate': 1}]}),
+    ])
+    assert [(label, str(totals.total)) for label, totals in computed] == [('good', '3.00')]
+    assert sorted(label for label, _ in skipped) == ['bad client', 'bad rate', 'no items']